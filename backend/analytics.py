@@ -0,0 +1,92 @@
+from sqlalchemy import text
+
+from interview_queue import CALLED_STATE, WAITING_STATE
+from stats import INTERVIEWED_STATE
+
+HOUR = 3600
+# Wait percentiles reported per specialist and for everyone together ('all')
+WAIT_PERCENTILES = (50, 90, 99)
+
+# Each call paired with the member's latest check-in before it; the outer
+# scan uses ix_transition_state_at and the lookup ix_transition_member
+_WAITS_SQL = '''
+    SELECT c.specialist, c.at - (
+        SELECT MAX(k.at) FROM transition k
+        WHERE k.member_id = c.member_id AND k.to_state = :waiting AND k.at <= c.at
+    ) AS wait
+    FROM transition c
+    WHERE c.to_state = :called AND c.at >= :start AND c.at < :end {specialist}
+'''
+
+# Answered from ix_transition_state_at alone, which covers specialist
+_INTERVIEWS_SQL = '''
+    SELECT specialist, at / {hour} * {hour} AS hour, COUNT(*)
+    FROM transition
+    WHERE to_state = :interviewed AND at >= :start AND at < :end {specialist}
+    GROUP BY specialist, hour
+    ORDER BY hour
+'''
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+
+def _wait_summary(waits):
+    if not waits:
+        return None
+    ordered = sorted(waits)
+    summary = {f'p{p}': _percentile(ordered, p) for p in WAIT_PERCENTILES}
+    summary.update(avg=round(sum(ordered) / len(ordered), 1), max=ordered[-1])
+    return summary
+
+
+def transition_report(session, start, end, specialist=None):
+    """Waits from check-in to Gọi PV and finished interviews per hour in [start, end).
+
+    `start` and `end` are epoch seconds. Only the transitions inside the
+    range are read, through the indexes, so the cost follows the range and
+    not the length of the season. Hours are epoch-aligned, which in GMT+7
+    are also local hours.
+    """
+    params = {'start': start, 'end': end, 'waiting': WAITING_STATE, 'called': CALLED_STATE,
+              'interviewed': INTERVIEWED_STATE, 'specialist': specialist}
+    waits_filter = 'AND c.specialist = :specialist' if specialist is not None else ''
+    interviews_filter = 'AND specialist = :specialist' if specialist is not None else ''
+
+    waits = {}
+    for row_specialist, wait in session.execute(text(_WAITS_SQL.format(specialist=waits_filter)), params):
+        if wait is not None:  # called without a logged check-in
+            waits.setdefault(row_specialist or '', []).append(wait)
+
+    hourly = {}
+    for row_specialist, hour, count in session.execute(
+            text(_INTERVIEWS_SQL.format(hour=HOUR, specialist=interviews_filter)), params):
+        hourly.setdefault(row_specialist or '', []).append([hour, count])
+
+    report = {}
+    for name in sorted(set(waits) | set(hourly)):
+        counts = hourly.get(name, [])
+        report[name] = {
+            'called': len(waits.get(name, ())),
+            'wait_seconds': _wait_summary(waits.get(name)),
+            'interviewed': sum(count for _, count in counts),
+            'interviews_per_hour': counts,
+        }
+
+    all_hours = {}
+    for counts in hourly.values():
+        for hour, count in counts:
+            all_hours[hour] = all_hours.get(hour, 0) + count
+    all_waits = [wait for values in waits.values() for wait in values]
+    return {
+        'from': start,
+        'to': end,
+        'all': {
+            'called': len(all_waits),
+            'wait_seconds': _wait_summary(all_waits),
+            'interviewed': sum(all_hours.values()),
+            'interviews_per_hour': sorted([hour, count] for hour, count in all_hours.items()),
+        },
+        'specialists': report,
+    }
@@ -1,32 +1,119 @@
-from flask import Flask, jsonify, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, Response, g, jsonify, request, send_file, session, stream_with_context
+from flask_socketio import SocketIO, emit, join_room
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from datetime import datetime, timezone, timedelta
+import base64
+import json
 import logging
-from werkzeug.security import generate_password_hash, check_password_hash
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+import os
+import time
+from sqlalchemy import or_, select, tuple_
+from flask_jwt_extended import JWTManager, create_access_token, current_user, jwt_required, get_jwt_identity
+from roster import RosterCache, SNAPSHOT_ENCODINGS
+from serializer import FORMATS, MEMBER_FIELDS, OBJECTS_FORMAT, SocketIOJSON, serialize_member
+from write_pipeline import GroupCommitPipeline, WriteOutcome
+from storage import configure_database
+from search import MemberSearchIndex
+from checkin import MssvIndex, CheckinDebouncer
+from broadcast import BroadcastBatcher, DEFAULT_AUDIENCE, audience, scope_members, scope_sync_payload
+from interview_queue import InterviewQueue, WAITING_STATE, CALLED_STATE
+from stats import RosterStats, StatsBroadcaster, INTERVIEW_STATES
+from auth import HasherBusy, PasswordHasher, UserCache
+from analytics import HOUR, transition_report
+from cv_cache import CvCache, CvFetchError, inline_content_type
+from badges import BadgeGenerator
+from export import EXPORT_FORMATS, stream_export
+from logs import configure_logging, log_event, SampledLogger
+import metrics
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'secret!'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///memberlist251.db'
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'connect_args': {'check_same_thread': False}
-}
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 app.config['JWT_SECRET_KEY'] = 'jwt-secret-string'  # Change this to a random secret key
+# Group-commit window for check-ins/edits; 0 commits every request on its own
+app.config['WRITE_BATCH_WINDOW_MS'] = 5
+app.config['WRITE_BATCH_MAX'] = 64
+# Window for merging member updates into members_batch frames; 0 disables batching
+app.config['BROADCAST_BATCH_WINDOW_MS'] = 50
+# Repeated scans of the same MSSV within this many seconds return the first result
+app.config['CHECKIN_DEBOUNCE_SECONDS'] = 3
+# Most scans a card reader may upload in one /api/esp/checkin/batch request
+app.config['ESP_BATCH_MAX'] = 500
+# Password hashing runs in this many worker processes, with at most
+# PASSWORD_HASH_MAX_PENDING hashes waiting; 0 hashes on the request thread
+app.config['PASSWORD_HASH_WORKERS'] = 2
+app.config['PASSWORD_HASH_MAX_PENDING'] = 32
+# Local copies of candidates' linkCV documents; CV_CACHE_DIR defaults to instance/cv_cache
+app.config['CV_CACHE_DIR'] = None
+app.config['CV_CACHE_MAX_BYTES'] = 500 * 1024 * 1024
+app.config['CV_PREFETCH_WORKERS'] = 4  # 0 disables prefetching on check-in
+app.config['CV_FETCH_TIMEOUT'] = 20
+app.config['CV_ALLOW_PRIVATE_HOSTS'] = False  # True lets links reach loopback/private addresses
+# QR badges (needs segno), drawn in BADGE_WORKERS processes; BADGE_DIR defaults to instance/badges
+app.config['BADGE_DIR'] = None
+app.config['BADGE_WORKERS'] = 2
+# stats_updated is sent at most once per window; 0 sends one per change
+app.config['STATS_BROADCAST_WINDOW_MS'] = 500
+# Rows fetched from the export cursor (and sent) per chunk
+app.config['EXPORT_CHUNK_ROWS'] = 500
+# 'threading' for the dev server; 'gevent' under gunicorn (see gunicorn.conf.py)
+app.config['SOCKETIO_ASYNC_MODE'] = 'threading'
+# e.g. redis://redis:6379/0 - required when running more than one worker process
+app.config['SOCKETIO_MESSAGE_QUEUE'] = None
+# Logging: DEBUG for development; gunicorn.conf.py sets production levels
+app.config['LOG_LEVEL'] = 'DEBUG'
+app.config['LOG_LEVELS'] = {}  # per-logger overrides, e.g. {"engineio.server": "WARNING"}
+app.config['LOG_FORMAT'] = 'text'  # or 'json'
+app.config['LOG_QUEUE_SIZE'] = 10000  # records beyond this are dropped, not waited for
+app.config['LOG_ENGINEIO_SAMPLE'] = 100  # keep 1 in N engine.io packet logs
+# Allow overrides such as FLASK_WRITE_BATCH_WINDOW_MS=0 from the environment
+app.config.from_prefixed_env()
+# DATABASE_URL, connection pool and SQLite pragmas (WAL, busy_timeout, ...)
+configure_database(app)
+# Log records are written by a background thread, off the request path
+log_handler = configure_logging(app)
 
 db = SQLAlchemy(app)
 # Use threading async_mode which is compatible with Python 3.12
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', logger=True, engineio_logger=True)
+# With a message queue, an emit from any worker process reaches every client
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+                    message_queue=app.config['SOCKETIO_MESSAGE_QUEUE'],
+                    # Compact UTF-8 packets; cached roster JSON is sent without re-encoding
+                    json=SocketIOJSON,
+                    logger=logging.getLogger('socketio.server'),
+                    # engine.io logs every packet to every client; keep a sample
+                    engineio_logger=SampledLogger(logging.getLogger('engineio.server'),
+                                                  app.config['LOG_ENGINEIO_SAMPLE']))
+
+# member_* broadcasts go through the batcher so bursts reach batch clients as one frame
+broadcaster = BroadcastBatcher(socketio, window_ms=app.config['BROADCAST_BATCH_WINDOW_MS'])
 
 # Enable CORS with more specific settings
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 jwt = JWTManager(app)
 
-# Configure detailed logging
-logging.basicConfig(level=logging.DEBUG, 
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+metrics.Counter('log_records_dropped_total', 'Log records dropped because the log queue was full',
+                value=lambda: log_handler.dropped)
+
+@app.before_request
+def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    metrics.start_request()
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.get('request_started')
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.finish_request(route, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus metrics of this process"""
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 # Helper function to get GMT+7 time
 def get_gmt7_time():
@@ -34,22 +121,59 @@ def get_gmt7_time():
     gmt7 = timezone(timedelta(hours=7))
     return datetime.now(gmt7)
 
+def gmt7_from_epoch(seconds):
+    """GMT+7 datetime of an epoch timestamp (e.g. a card reader's scan time)"""
+    return datetime.fromtimestamp(seconds, timezone(timedelta(hours=7)))
+
 def format_gmt7_time(dt=None):
     """Format GMT+7 time as string"""
     if dt is None:
         dt = get_gmt7_time()
     return dt.strftime('%H:%M:%S %d/%m/%Y')
 
+def _parse_version(value):
+    """Parse a client-supplied roster version, None if missing or invalid"""
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
 class Member(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     MSSV = db.Column(db.String(20), nullable=False, unique=True)  # Increased size for MSSV
     email = db.Column(db.String(100))
-    specialist = db.Column(db.String(100))
+    specialist = db.Column(db.String(100), index=True)
     linkCV = db.Column(db.String(500))  # Increased size for long URLs
     checkin_time = db.Column(db.String(100), nullable=True)
-    state = db.Column(db.String(100), nullable=True, default='Chưa checkin')
+    state = db.Column(db.String(100), nullable=True, default='Chưa checkin', index=True)
     note = db.Column(db.String(500), nullable=True)  # New field for notes
+    source_timestamp = db.Column(db.String(100), nullable=True)  # Timestamp of the sign-up sheet row
+    called_time = db.Column(db.String(100), nullable=True)  # When the candidate left the waiting line
+
+    # Interviewer screens filter on specialist and state together
+    __table_args__ = (db.Index('ix_member_specialist_state', 'specialist', 'state'),)
+
+class Transition(db.Model):
+    """Append-only log of state changes, written in the transaction that makes them"""
+    id = db.Column(db.Integer, primary_key=True)
+    member_id = db.Column(db.Integer, nullable=False)  # no foreign key: history outlives deletions
+    specialist = db.Column(db.String(100))  # at the time of the transition
+    from_state = db.Column(db.String(100))
+    to_state = db.Column(db.String(100), nullable=False)
+    at = db.Column(db.Integer, nullable=False)  # epoch seconds
+    source = db.Column(db.String(20))  # edit, desk, ESP, queue
+
+    __table_args__ = (
+        db.Index('ix_transition_state_at', 'to_state', 'at', 'specialist', 'member_id'),
+        db.Index('ix_transition_member', 'member_id', 'to_state', 'at'),
+    )
+
+def _log_transition(member, previous_state, source, at=None):
+    """Add a Transition for `member`'s new state to the current transaction"""
+    db.session.add(Transition(member_id=member.id, specialist=member.specialist, from_state=previous_state,
+                              to_state=member.state, at=int(at if at is not None else time.time()),
+                              source=source))
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -58,6 +182,71 @@ class User(db.Model):
     MSSV = db.Column(db.String(20), db.ForeignKey('member.MSSV'), nullable=False)
     member = db.relationship('Member', backref=db.backref('user', lazy=True))
 
+password_hasher = PasswordHasher(app.config['PASSWORD_HASH_WORKERS'], app.config['PASSWORD_HASH_MAX_PENDING'])
+
+def _load_user(username):
+    user = User.query.filter_by(username=username).first()
+    return {'id': user.id, 'username': user.username, 'MSSV': user.MSSV} if user else None
+
+# current_user for @jwt_required() routes, without a query per request
+user_cache = UserCache(_load_user)
+
+@jwt.user_lookup_loader
+def _lookup_jwt_user(_jwt_header, jwt_data):
+    return user_cache.get(jwt_data['sub'])
+
+# Concurrent check-ins and edits share one transaction/fsync
+write_pipeline = GroupCommitPipeline(
+    app, db,
+    window_ms=app.config['WRITE_BATCH_WINDOW_MS'],
+    max_batch=app.config['WRITE_BATCH_MAX']
+)
+
+# Server-side roster cache: reads never hit SQLite, writes update it after commit
+roster = RosterCache(
+    lambda: [serialize_member(m) for m in Member.query.order_by(Member.id).all()],
+    log_size=app.config.get('ROSTER_CHANGELOG_SIZE', 1000)
+)
+# Diacritic-insensitive prefix search for the check-in desk, fed by the roster
+member_search = MemberSearchIndex()
+roster.add_listener(member_search)
+
+# O(1) MSSV lookup and duplicate-scan suppression for the check-in endpoints
+mssv_index = MssvIndex()
+roster.add_listener(mssv_index)
+checkin_debouncer = CheckinDebouncer(app.config['CHECKIN_DEBOUNCE_SECONDS'])
+
+# Per-specialist queue of checked-in candidates, oldest check-in first
+interview_queue = InterviewQueue()
+roster.add_listener(interview_queue)
+
+# Counts per state/specialist, wait and throughput, rebuilt with the roster
+member_stats = RosterStats()
+roster.add_listener(member_stats)
+
+def _stats_snapshot():
+    # checkin_time and called_time are naive GMT+7
+    return member_stats.snapshot(get_gmt7_time().replace(tzinfo=None))
+
+# CVs are downloaded when a candidate checks in, ready for the interviewer
+cv_cache = CvCache(app.config['CV_CACHE_DIR'] or os.path.join(app.instance_path, 'cv_cache'),
+                   max_bytes=app.config['CV_CACHE_MAX_BYTES'], workers=app.config['CV_PREFETCH_WORKERS'],
+                   timeout=app.config['CV_FETCH_TIMEOUT'], allow_private=app.config['CV_ALLOW_PRIVATE_HOSTS'])
+roster.add_listener(cv_cache)
+
+badge_generator = BadgeGenerator(app.config['BADGE_DIR'] or os.path.join(app.instance_path, 'badges'),
+                                 workers=app.config['BADGE_WORKERS'])
+
+stats_broadcaster = StatsBroadcaster(socketio, _stats_snapshot, window_ms=app.config['STATS_BROADCAST_WINDOW_MS'])
+
+if app.config['SOCKETIO_MESSAGE_QUEUE']:
+    # Several workers: share roster versions and changes through the same Redis
+    import redis
+    from roster_sync import RosterSync
+    roster_sync = RosterSync(redis.Redis.from_url(app.config['SOCKETIO_MESSAGE_QUEUE']), roster)
+    roster_sync.start(socketio)
+    roster.attach_sync(roster_sync)
+
 @app.route('/api/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -68,10 +257,14 @@ def register():
     if User.query.filter_by(username=username).first():
         return jsonify({'message': 'Username already exists'}), 400
 
-    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')
+    try:
+        hashed_password = password_hasher.hash(password)
+    except HasherBusy:
+        return _hasher_busy()
     new_user = User(username=username, password=hashed_password, MSSV=MSSV)
     db.session.add(new_user)
     db.session.commit()
+    user_cache.invalidate(username)
 
     return jsonify({'message': 'User registered successfully'}), 201
 
@@ -82,30 +275,152 @@ def login():
     password = data.get('password')
 
     user = User.query.filter_by(username=username).first()
-    if not user or not check_password_hash(user.password, password):
-        return jsonify({'message': 'Invalid credentials'}), 401
+    try:
+        if not user or not password_hasher.verify(user.password, password):
+            return jsonify({'message': 'Invalid credentials'}), 401
+    except HasherBusy:
+        return _hasher_busy()
 
-    access_token = create_access_token(identity={'username': user.username, 'MSSV': user.MSSV})
+    # The subject must be a string; the MSSV travels as an extra claim
+    access_token = create_access_token(identity=user.username, additional_claims={'MSSV': user.MSSV})
     return jsonify({'access_token': access_token}), 200
 
+def _hasher_busy():
+    logging.warning("Password hashing queue full, rejecting request")
+    response = jsonify({'message': 'Server busy, please try again'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+@app.route('/api/me', methods=['GET'])
+@jwt_required()
+def get_current_user():
+    """The logged-in user, from the token and the user cache"""
+    return jsonify({'username': get_jwt_identity(), 'MSSV': current_user['MSSV']})
+
+def _roster_etag(version, encoding=None):
+    """Strong ETag for one representation of the roster at `version`"""
+    return f"v{version}-{encoding}" if encoding else f"v{version}"
+
+def _roster_response():
+    """Serve the cached roster with a strong ETag, 304s and pre-compressed bodies"""
+    encoding = next((enc for enc in SNAPSHOT_ENCODINGS if request.accept_encodings[enc]), None)
+    version, body = roster.snapshot(encoding)
+    etag = _roster_etag(version, encoding)
+
+    # All encodings of the same version carry the same content
+    if any(request.if_none_match.contains(_roster_etag(version, enc))
+           for enc in (None,) + SNAPSHOT_ENCODINGS):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# Sort keys for the paginated member query; ties are broken by id
+MEMBER_SORT_KEYS = {
+    'id': Member.id,
+    'name': Member.name,
+    'MSSV': Member.MSSV,
+}
+MEMBER_QUERY_PARAMS = ('state', 'specialist', 'q', 'sort', 'order', 'limit', 'cursor')
+MEMBER_PAGE_SIZE = 50
+MEMBER_PAGE_MAX = 500
+
+def _encode_cursor(sort_value, member_id):
+    raw = json.dumps([sort_value, member_id], ensure_ascii=False).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+def _decode_cursor(cursor):
+    try:
+        sort_value, member_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return sort_value, int(member_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+def _query_members(args):
+    """Filtered, sorted, keyset-paginated member page straight from the indexed table"""
+    sort = args.get('sort', 'id')
+    if sort not in MEMBER_SORT_KEYS:
+        raise ValueError(f"Invalid sort key '{sort}', expected one of {', '.join(MEMBER_SORT_KEYS)}")
+    descending = args.get('order', 'asc') == 'desc'
+    limit = args.get('limit', MEMBER_PAGE_SIZE, type=int)
+    if limit is None or limit < 1:
+        raise ValueError('limit must be a positive integer')
+    limit = min(limit, MEMBER_PAGE_MAX)
+
+    query = Member.query
+    states = args.getlist('state')
+    if states:
+        query = query.filter(Member.state.in_(states))
+    specialists = args.getlist('specialist')
+    if specialists:
+        query = query.filter(Member.specialist.in_(specialists))
+    text = args.get('q', '').strip()
+    if text:
+        pattern = f"%{text}%"
+        query = query.filter(or_(Member.name.ilike(pattern), Member.MSSV.like(pattern), Member.email.ilike(pattern)))
+
+    column = MEMBER_SORT_KEYS[sort]
+    cursor = args.get('cursor')
+    if cursor:
+        sort_value, last_id = _decode_cursor(cursor)
+        if column is Member.id:
+            query = query.filter(Member.id < last_id if descending else Member.id > last_id)
+        else:
+            position = tuple_(column, Member.id)
+            after = tuple_(sort_value, last_id)
+            query = query.filter(position < after if descending else position > after)
+    if column is Member.id:
+        order_by = (Member.id.desc() if descending else Member.id,)
+    else:
+        order_by = (column.desc(), Member.id.desc()) if descending else (column, Member.id)
+
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        last = page[-1]
+        next_cursor = _encode_cursor(getattr(last, sort), last.id)
+    return {
+        'members': [serialize_member(m) for m in page],
+        'next_cursor': next_cursor,
+        'version': roster.version
+    }
+
 @app.route('/api/members', methods=['GET'])
 # @jwt_required()
 def get_members():
     try:
-        members = Member.query.all()
-        return jsonify([{
-            'id': member.id,
-            'MSSV': member.MSSV,
-            'name': member.name,
-            'email': member.email,
-            'specialist': member.specialist,
-            'linkCV': member.linkCV,
-            'checkin_time': member.checkin_time,
-            'state': member.state,
-            'note': member.note
-        } for member in members])
+        # ?since=<version> returns only the changes after that roster version
+        since = request.args.get('since', type=int)
+        if since is not None:
+            return jsonify(roster.sync_payload(since))
+        # Any filter/sort/page parameter switches to the paginated query
+        if any(param in request.args for param in MEMBER_QUERY_PARAMS):
+            try:
+                return jsonify(_query_members(request.args))
+            except ValueError as e:
+                return jsonify({'message': str(e)}), 400
+        return _roster_response()
     except Exception as e:
-        logging.error(f"Error getting members: {e}")
+        logging.error("Error getting members: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/members/search', methods=['GET'])
+def search_members():
+    """Ranked prefix search on name/MSSV/email, ignoring diacritics ('nguyen phuc nam')"""
+    try:
+        query = request.args.get('q', '')
+        limit = min(request.args.get('limit', 10, type=int) or 10, MEMBER_PAGE_MAX)
+        roster.ensure_loaded()
+        results = [roster.get(member_id) for member_id in member_search.search(query, limit)]
+        return jsonify({'results': [member for member in results if member is not None]})
+    except Exception as e:
+        logging.error("Error searching members: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # @jwt_required()
@@ -124,31 +439,15 @@ def add_member():
         )
         db.session.add(new_member)
         db.session.commit()
-        socketio.emit('member_added', {
-            'id': new_member.id,
-            'MSSV': new_member.MSSV,
-            'name': new_member.name,
-            'email': new_member.email,
-            'specialist': new_member.specialist,
-            'linkCV': new_member.linkCV,
-            'checkin_time': new_member.checkin_time,
-            'state': new_member.state,
-            'note': new_member.note
-        })
-        logging.info(f"Member added: {new_member.name}")
-        return jsonify({'message': 'Member added successfully', 'member': {
-            'id': new_member.id,
-            'MSSV': new_member.MSSV,
-            'name': new_member.name,
-            'email': new_member.email,
-            'specialist': new_member.specialist,
-            'linkCV': new_member.linkCV,
-            'checkin_time': new_member.checkin_time,
-            'state': new_member.state,
-            'note': new_member.note
-        }}), 201
+        member_data = serialize_member(new_member)
+        version = roster.upsert(member_data)
+        broadcaster.emit('member_added', {**member_data, 'version': version})
+        stats_broadcaster.changed()
+        logging.info("Member added: %s", new_member.name)
+        return jsonify({'message': 'Member added successfully', 'member': member_data}), 201
     except Exception as e:
-        logging.error(f"Error adding member: {e}")
+        db.session.rollback()
+        logging.error("Error adding member: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # @jwt_required()
@@ -156,9 +455,14 @@ def add_member():
 def edit_member(id):
     try:
         data = request.get_json()
-        member = Member.query.get(id)
-        if member:
+
+        def job():
+            member = Member.query.get(id)
+            if not member:
+                return WriteOutcome({'message': 'Member not found'}, 404)
             previous_state = member.state  # Store previous state to check for transitions
+            previous_mssv = member.MSSV
+            previous_specialist = member.specialist
             
             # Update member data
             member.name = data.get('name', member.name)
@@ -171,41 +475,49 @@ def edit_member(id):
             # Check for state change
             if 'state' in data:
                 member.state = data['state']
-                
-            db.session.commit()
+            # The wait (for /api/stats) ends when the candidate is first called
+            if member.state not in INTERVIEW_STATES:
+                member.called_time = None
+            elif previous_state not in INTERVIEW_STATES:
+                member.called_time = format_gmt7_time()
+            if member.state != previous_state:
+                _log_transition(member, previous_state, 'edit')
             
             # Create response data
-            member_data = {
-                'id': member.id,
-                'MSSV': member.MSSV,
-                'name': member.name,
-                'email': member.email,
-                'specialist': member.specialist,
-                'linkCV': member.linkCV,
-                'state': member.state,
-                'checkin_time': member.checkin_time,
-                'note': member.note
-            }
-            
-            # Emit different events based on state changes and transitions
-            if member.state == 'Gọi PV' and previous_state != 'Gọi PV':
-                # logging.info(f"Emitting interview call event for: {member.name}")
-                socketio.emit('member_interview_called', member_data)
-            elif member.state == 'Đang phỏng vấn' and previous_state != 'Đang phỏng vấn':
-                # logging.info(f"Emitting interview started event for: {member.name}")
-                socketio.emit('member_interview_started', member_data)
-            elif member.state == 'Đã phỏng vấn' and previous_state != 'Đã phỏng vấn':
-                # logging.info(f"Emitting interview completed event for: {member.name}")
-                socketio.emit('member_interview_ended', member_data)
-            else:
-                socketio.emit('member_edited', member_data)
+            member_data = serialize_member(member)
+
+            def after_commit():
+                version = roster.upsert(member_data)
+                checkin_debouncer.forget(previous_mssv)
+                checkin_debouncer.forget(member_data['MSSV'])
+                event_data = {**member_data, 'version': version}
+                state = member_data['state']
                 
-            logging.info(f"Member edited: {member.name}, state changed from {previous_state} to {member.state}")
-            return jsonify({'message': 'Member edited successfully', 'member': member_data})
-        else:
-            return jsonify({'message': 'Member not found'}), 404
+                # Emit different events based on state changes and transitions
+                if state == 'Gọi PV' and previous_state != 'Gọi PV':
+                    event = 'member_interview_called'
+                elif state == 'Đang phỏng vấn' and previous_state != 'Đang phỏng vấn':
+                    event = 'member_interview_started'
+                elif state == 'Đã phỏng vấn' and previous_state != 'Đã phỏng vấn':
+                    event = 'member_interview_ended'
+                else:
+                    event = 'member_edited'
+                broadcaster.emit(event, event_data, previous_specialist=previous_specialist)
+                stats_broadcaster.changed()
+                if state != previous_state:
+                    metrics.count_transition(state)
+                    log_event('transition', member_id=member_data['id'], mssv=member_data['MSSV'],
+                              previous_state=previous_state, state=state)
+                else:
+                    logging.debug("Member edited: %s", member_data['name'])
+
+            return WriteOutcome({'message': 'Member edited successfully', 'member': member_data}, 200, after_commit)
+
+        outcome = write_pipeline.run(job)
+        return jsonify(outcome.body), outcome.status
     except Exception as e:
-        logging.error(f"Error editing member: {e}")
+        db.session.rollback()
+        logging.error("Error editing member: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # @jwt_required()
@@ -216,72 +528,210 @@ def delete_member(id):
         if member:
             db.session.delete(member)
             db.session.commit()
-            socketio.emit('member_deleted', {'id': id})
-            logging.info(f"Member deleted: {member.name}")
+            version = roster.remove(id)
+            broadcaster.emit('member_deleted', {'id': id, 'version': version}, previous_specialist=member.specialist)
+            stats_broadcaster.changed()
+            logging.info("Member deleted: %s", member.name)
             return jsonify({'message': 'Member deleted successfully'})
         else:
             return jsonify({'message': 'Member not found'}), 404
     except Exception as e:
-        logging.error(f"Error deleting member: {e}")
+        db.session.rollback()
+        logging.error("Error deleting member: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/members/<int:id>/cv', methods=['GET'])
+def get_member_cv(id):
+    """The member's linkCV document, from the local cache (with Range support); only PDFs and images inline"""
+    try:
+        roster.ensure_loaded()
+        member = roster.get(id)
+        if not member:
+            return jsonify({'message': 'Member not found'}), 404
+        if not member.get('linkCV'):
+            return jsonify({'message': 'Member has no CV'}), 404
+        try:
+            path, content_type = cv_cache.get(member['linkCV'])
+        except CvFetchError as e:
+            logging.warning("Could not fetch CV of member %s: %s", id, e)
+            return jsonify({'message': f'Could not fetch CV: {e}'}), 502
+        media_type = inline_content_type(content_type)
+        if media_type is None:
+            response = send_file(path, mimetype='application/octet-stream', as_attachment=True,
+                                 download_name=f"cv-{member['MSSV']}", conditional=True)
+        else:
+            response = send_file(path, mimetype=media_type, conditional=True)
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        return response
+    except Exception as e:
+        logging.error("Error serving CV: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+def _filter_roster(args):
+    """Roster members matching the optional ?state= and ?specialist= filters (repeatable, as in _query_members)"""
+    roster.ensure_loaded()
+    states, specialists = set(args.getlist('state')), set(args.getlist('specialist'))
+    return [member for member in roster.members()
+            if (not states or member['state'] in states)
+            and (not specialists or member['specialist'] in specialists)]
+
+BADGES_UNAVAILABLE = {'message': 'QR badges need the segno package: pip install segno'}
+
+@app.route('/api/badges', methods=['POST'])
+def generate_badges():
+    """Draw the missing QR badges (all members, or ?state= / ?specialist=) and wait for them"""
+    try:
+        if not badge_generator.available:
+            return jsonify(BADGES_UNAVAILABLE), 501
+        members = _filter_roster(request.args)
+        paths, drawn = badge_generator.generate(members)
+        for path in paths:
+            if not isinstance(path, str):
+                path.result()
+        logging.info("Badges: %s drawn, %s cached", drawn, len(members) - drawn)
+        return jsonify({'members': len(members), 'drawn': drawn, 'cached': len(members) - drawn})
+    except Exception as e:
+        logging.error("Error generating badges: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/badges.zip', methods=['GET'])
+def download_badges():
+    """ZIP of the members' QR badges, streamed while missing ones are drawn"""
+    try:
+        if not badge_generator.available:
+            return jsonify(BADGES_UNAVAILABLE), 501
+        members = _filter_roster(request.args)
+        return Response(badge_generator.stream_zip(members), mimetype='application/zip',
+                        headers={'Content-Disposition': 'attachment; filename=badges.zip'})
+    except Exception as e:
+        logging.error("Error downloading badges: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+def _export_batches(statement, chunk_rows):
+    """Rows of `statement` in batches, fetched from a streaming cursor on a connection of its own"""
+    with db.engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_rows).execute(statement)
+        yield from result.partitions()
+
+@app.route('/api/members/export', methods=['GET'])
+def export_members():
+    """Roster as CSV or XLSX (?format=csv|xlsx, optional ?state= / ?specialist=), streamed from the database"""
+    try:
+        fmt = request.args.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'message': f"Invalid format '{fmt}', expected one of {', '.join(EXPORT_FORMATS)}"}), 400
+        columns = Member.__table__.c
+        statement = select(*(columns[field] for field in MEMBER_FIELDS)).order_by(columns.id)
+        states = request.args.getlist('state')
+        if states:
+            statement = statement.where(columns.state.in_(states))
+        specialists = request.args.getlist('specialist')
+        if specialists:
+            statement = statement.where(columns.specialist.in_(specialists))
+
+        def generate():
+            try:
+                yield from stream_export(fmt, MEMBER_FIELDS,
+                                         _export_batches(statement, app.config['EXPORT_CHUNK_ROWS']))
+            except Exception as e:
+                # Headers are already sent; aborting the response beats a silently truncated file
+                logging.error("Error streaming member export: %s", e)
+                raise
+
+        return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt],
+                        headers={'Content-Disposition': f'attachment; filename=members.{fmt}'})
+    except Exception as e:
+        logging.error("Error exporting members: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+# States that can no longer check in, with the reason returned to the scanner
+CHECKIN_BLOCKED_STATES = {
+    'Đang phỏng vấn': 'Cannot check in. Member is currently in an interview',
+    'Đã phỏng vấn': 'Member has already completed their interview',
+}
+
+def _checkin_rejection(member_data, source):
+    message = CHECKIN_BLOCKED_STATES.get(member_data['state'])
+    if message:
+        log_event('checkin_rejected', logging.WARNING, mssv=member_data['MSSV'], member_id=member_data['id'],
+                  source=source, reason=member_data['state'])
+        return WriteOutcome({'message': message}, 400)
+    return None
+
+def _apply_checkin(member, source, at=None):
+    """Pipeline job step shared by every check-in path: check a Member row in.
+
+    `at` is the scan time in epoch seconds (now by default). A member that
+    is already checked in is checked in again: a new scan restarts the
+    wait. Returns the rejection, or a 200 outcome with the member's data
+    for _publish_checkin() once committed.
+    """
+    rejection = _checkin_rejection(serialize_member(member), source)
+    if rejection:
+        return rejection
+    previous_state = member.state
+    member.checkin_time = format_gmt7_time(gmt7_from_epoch(at) if at is not None else None)
+    member.state = WAITING_STATE
+    member.called_time = None
+    _log_transition(member, previous_state, source, at=at)
+    return WriteOutcome({'message': 'Check-in successful', 'member': serialize_member(member)}, 200)
+
+def _publish_checkin(member_data, source, **fields):
+    """After commit: cache, count and log a check-in; returns its member_checked_in payload"""
+    version = roster.upsert(member_data)
+    metrics.count_transition(member_data['state'])
+    log_event('checkin', mssv=member_data['MSSV'], source=source, member_id=member_data['id'],
+              checkin_time=member_data['checkin_time'], **fields)
+    return {**member_data, 'version': version}
+
+def _checkin(mssv, source):
+    """Check a member in by MSSV; shared by the desk and the ESP card readers"""
+    mssv = str(mssv).strip() if mssv is not None else ''
+    roster.ensure_loaded()
+
+    def checkin():
+        member_id = mssv_index.get(mssv)
+        if member_id is None:
+            log_event('checkin_rejected', logging.WARNING, mssv=mssv, source=source, reason='not_found')
+            return WriteOutcome({'message': 'Member not found'}, 404)
+        # Reject from the cache first so refused scans never reach the database
+        rejection = _checkin_rejection(roster.get(member_id), source)
+        if rejection:
+            return rejection
+
+        def job():
+            member = Member.query.get(member_id)
+            if not member or member.MSSV != mssv:
+                return WriteOutcome({'message': 'Member not found'}, 404)
+            # The state may have changed since the cache check
+            outcome = _apply_checkin(member, source)
+            if outcome.status != 200:
+                return outcome
+            member_data = outcome.body['member']
+
+            def after_commit():
+                broadcaster.emit('member_checked_in', _publish_checkin(member_data, source))
+                stats_broadcaster.changed()
+
+            return WriteOutcome(outcome.body, 200, after_commit)
+
+        return write_pipeline.run(job)
+
+    outcome, duplicate = checkin_debouncer.run(mssv, checkin)
+    if duplicate:
+        log_event('checkin_duplicate', logging.DEBUG, mssv=mssv, source=source)
+    return jsonify(outcome.body), outcome.status
+
 @app.route('/api/checkin', methods=['POST'])
 # Remove the @jwt_required() decorator
 def checkin_member():
     try:
         data = request.get_json()
         uid = data.get('uid')  # uid có thể là MSSV hoặc ID khác
-        
-        # Try to find member by MSSV
-        member = Member.query.filter_by(MSSV=uid).first()
-            
-        if member:
-            # Check if member is currently in an interview or has completed interview
-            if member.state == 'Đang phỏng vấn':
-                logging.warning(f"Member {member.name} is currently in an interview and cannot check in")
-                return jsonify({
-                    'message': 'Cannot check in. Member is currently in an interview'
-                }), 400
-            elif member.state == 'Đã phỏng vấn':
-                logging.warning(f"Member {member.name} has already completed their interview")
-                return jsonify({
-                    'message': 'Member has already completed their interview'
-                }), 400
-                
-            current_time = format_gmt7_time()
-            member.checkin_time = current_time
-            member.state = 'Đã checkin'
-            db.session.commit()
-            
-            socketio.emit('member_checked_in', {
-                'id': member.id,
-                'MSSV': member.MSSV,
-                'name': member.name,
-                'email': member.email,
-                'specialist': member.specialist,
-                'linkCV': member.linkCV,
-                'checkin_time': member.checkin_time,
-                'state': member.state,
-                'note': member.note
-            })
-            
-            logging.info(f"Member checked in: {member.name}")
-            return jsonify({'message': 'Check-in successful', 'member': {
-                'id': member.id,
-                'MSSV': member.MSSV,
-                'name': member.name,
-                'email': member.email,
-                'specialist': member.specialist,
-                'linkCV': member.linkCV,
-                'checkin_time': member.checkin_time,
-                'state': member.state,
-                'note': member.note
-            }})
-        else:
-            logging.warning(f"Member not found with uid: {uid}")
-            return jsonify({'message': 'Member not found'}), 404
+        return _checkin(uid, 'desk')
     except Exception as e:
-        logging.error(f"Error checking in member: {e}")
+        db.session.rollback()
+        logging.error("Error checking in member: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # @jwt_required()
@@ -290,87 +740,352 @@ def checkin_member_esp():
     try:
         data = request.get_json()
         mssv = data.get('MSSV')  # Changed from IDcard to MSSV
-        member = Member.query.filter_by(MSSV=mssv).first()
-        if member:
-            member.checkin_time = format_gmt7_time()
-            member.state = 'Đã checkin'
-            db.session.commit()
-            socketio.emit('member_checked_in', {
-                'id': member.id,
-                'MSSV': member.MSSV,
-                'name': member.name,
-                'email': member.email,
-                'specialist': member.specialist,
-                'linkCV': member.linkCV,
-                'checkin_time': member.checkin_time,
-                'state': member.state,
-                'note': member.note
-            })
-            logging.info(f"Member checked in (ESP): {member.name}")
-            return jsonify({'message': 'Check-in successful', 'member': {
-                'id': member.id,
-                'MSSV': member.MSSV,
-                'name': member.name,
-                'email': member.email,
-                'specialist': member.specialist,
-                'linkCV': member.linkCV,
-                'checkin_time': member.checkin_time,
-                'state': member.state,
-                'note': member.note
-            }})
-        else:
-            return jsonify({'message': 'Member not found'}), 404
+        return _checkin(mssv, 'ESP')
     except Exception as e:
-        logging.error(f"Error checking in member (ESP): {e}")
+        db.session.rollback()
+        logging.error("Error checking in member (ESP): %s", e)
+        return jsonify({'error': str(e)}), 500
+
+# Scans can arrive late (a reader's buffer) or twice (a retransmitted batch)
+ESP_SCAN_MAX_SKEW = 300  # seconds a reader's clock may run ahead of ours
+
+def _parse_scan(scan, now):
+    """(MSSV, device_id, scanned_at epoch seconds) of a batch item, or None if invalid"""
+    if not isinstance(scan, dict) or scan.get('MSSV') is None:
+        return None
+    mssv = str(scan['MSSV']).strip()
+    scanned_at = scan.get('scanned_at', now)
+    if not mssv or isinstance(scanned_at, bool) or not isinstance(scanned_at, (int, float)) \
+            or not 0 < scanned_at <= now + ESP_SCAN_MAX_SKEW:
+        return None
+    return mssv, scan.get('device_id'), int(scanned_at)
+
+@app.route('/api/esp/checkin/batch', methods=['POST'])
+def checkin_members_esp_batch():
+    """Apply buffered card-reader scans [{MSSV, device_id, scanned_at}] in one transaction.
+
+    Each scan keeps the reader's time as checkin_time and is checked in by
+    the same rules as a single scan (_apply_checkin). Returns one result
+    per item, in order, with a status: checked_in, duplicate (already
+    applied: the same scan time is in the transition log, so a
+    retransmitted batch changes nothing; or a repeat within the check-in
+    debounce window), stale (the member changed after the scan),
+    rejected, not_found or invalid.
+    """
+    try:
+        data = request.get_json()
+        scans = data.get('scans') if isinstance(data, dict) else data
+        if not isinstance(scans, list):
+            return jsonify({'message': 'Expected a list of scans'}), 400
+        if len(scans) > app.config['ESP_BATCH_MAX']:
+            return jsonify({'message': f"At most {app.config['ESP_BATCH_MAX']} scans per batch"}), 413
+        now = int(time.time())
+        parsed = [_parse_scan(scan, now) for scan in scans]
+
+        def job():
+            mssvs = {scan[0] for scan in parsed if scan}
+            members = {m.MSSV: m for m in Member.query.filter(Member.MSSV.in_(mssvs))} if mssvs else {}
+            # Transitions since the oldest scan: enough to spot retransmissions and stale scans
+            history = {}
+            if members:
+                oldest = min(scan[2] for scan in parsed if scan)
+                for member_id, to_state, at in db.session.query(
+                        Transition.member_id, Transition.to_state, Transition.at).filter(
+                        Transition.member_id.in_([m.id for m in members.values()]), Transition.at >= oldest):
+                    history.setdefault(member_id, []).append((to_state, at))
+
+            results = [None] * len(scans)
+            checked_in = {}  # MSSV -> (member data, device_id, scanned_at) of its latest check-in
+            # Oldest scan first, so repeats of a member in the batch are debounced like single scans
+            order = sorted((i for i, scan in enumerate(parsed) if scan), key=lambda i: parsed[i][2])
+            for i, scan in enumerate(parsed):
+                if scan is None:
+                    results[i] = {'status': 'invalid', 'message': 'MSSV and a valid scanned_at are required'}
+            for i in order:
+                mssv, device_id, scanned_at = parsed[i]
+                result = results[i] = {'MSSV': mssv, 'device_id': device_id, 'scanned_at': scanned_at}
+                member = members.get(mssv)
+                if member is None:
+                    log_event('checkin_rejected', logging.WARNING, mssv=mssv, source='ESP', device_id=device_id,
+                              reason='not_found')
+                    result['status'] = 'not_found'
+                    continue
+                result['member_id'] = member.id
+                transitions = history.setdefault(member.id, [])
+                earlier = checked_in.get(mssv)
+                if (WAITING_STATE, scanned_at) in transitions:
+                    result['status'] = 'duplicate'
+                elif any(at > scanned_at for _, at in transitions):
+                    result['status'] = 'stale'
+                    result['message'] = 'Member changed after this scan'
+                elif (earlier is None and checkin_debouncer.recent(mssv) is not None) or \
+                        (earlier is not None and scanned_at - earlier[2] < checkin_debouncer.window):
+                    log_event('checkin_duplicate', logging.DEBUG, mssv=mssv, source='ESP', device_id=device_id)
+                    result['status'] = 'duplicate'
+                else:
+                    outcome = _apply_checkin(member, 'ESP', at=scanned_at)
+                    if outcome.status != 200:
+                        result['status'] = 'rejected'
+                        result['message'] = outcome.body['message']
+                        continue
+                    transitions.append((WAITING_STATE, scanned_at))
+                    result['status'] = 'checked_in'
+                    checked_in[mssv] = (outcome.body['member'], device_id, scanned_at)
+
+            def after_commit():
+                events = []
+                for mssv, (member_data, device_id, _) in checked_in.items():
+                    events.append(_publish_checkin(member_data, 'ESP', device_id=device_id))
+                    checkin_debouncer.remember(mssv, WriteOutcome(
+                        {'message': 'Check-in successful', 'member': member_data}, 200))
+                if events:
+                    broadcaster.emit_many('member_checked_in', events)
+                    stats_broadcaster.changed()
+
+            checked_in_count = sum(result['status'] == 'checked_in' for result in results)
+            return WriteOutcome({'checked_in': checked_in_count, 'results': results}, 200, after_commit)
+
+        outcome = write_pipeline.run(job)
+        return jsonify(outcome.body), outcome.status
+    except Exception as e:
+        db.session.rollback()
+        logging.error("Error checking in member batch (ESP): %s", e)
+        return jsonify({'error': str(e)}), 500
+
+INTERVIEW_QUEUE_PAGE = 20
+
+@app.route('/api/queue/<specialist>', methods=['GET'])
+def get_interview_queue(specialist):
+    """Checked-in candidates of a specialist waiting for an interview, longest-waiting first"""
+    try:
+        limit = min(request.args.get('limit', INTERVIEW_QUEUE_PAGE, type=int) or INTERVIEW_QUEUE_PAGE,
+                    MEMBER_PAGE_MAX)
+        roster.ensure_loaded()
+        member_ids, length = interview_queue.peek(specialist, limit)
+        members = [member for member in map(roster.get, member_ids) if member is not None]
+        return jsonify({'specialist': specialist, 'length': length, 'members': members}), 200
+    except Exception as e:
+        logging.error("Error getting interview queue: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+def _call_candidate(member_id):
+    """Pipeline job: move a waiting member to Gọi PV, only if still waiting"""
+    # Conditional update, so a candidate claimed by another worker is not called twice
+    called = Member.query.filter_by(id=member_id, state=WAITING_STATE).update(
+        {'state': CALLED_STATE, 'called_time': format_gmt7_time()})
+    if not called:
+        return WriteOutcome({'message': 'Candidate is no longer waiting'}, 409)
+    member = Member.query.get(member_id)
+    _log_transition(member, WAITING_STATE, 'queue')
+    member_data = serialize_member(member)
+
+    def after_commit():
+        version = roster.upsert(member_data)
+        checkin_debouncer.forget(member_data['MSSV'])
+        broadcaster.emit('member_interview_called', {**member_data, 'version': version})
+        stats_broadcaster.changed()
+        metrics.count_transition(CALLED_STATE)
+        log_event('transition', member_id=member_id, mssv=member_data['MSSV'],
+                  previous_state=WAITING_STATE, state=CALLED_STATE)
+
+    return WriteOutcome({'message': 'Candidate called', 'member': member_data}, 200, after_commit)
+
+@app.route('/api/queue/<specialist>/next', methods=['POST'])
+def call_next_candidate(specialist):
+    """Claim the longest-waiting candidate of a specialist and set Gọi PV in one step"""
+    try:
+        roster.ensure_loaded()
+        while True:
+            member_id = interview_queue.claim(specialist)
+            if member_id is None:
+                return jsonify({'message': 'No candidate waiting'}), 409
+            try:
+                outcome = write_pipeline.run(lambda: _call_candidate(member_id))
+            except Exception:
+                interview_queue.release(member_id, roster.get(member_id))
+                raise
+            if outcome.status == 200:
+                interview_queue.release(member_id, outcome.body['member'])
+                return jsonify(outcome.body), 200
+            # Changed elsewhere and not yet seen here; the roster update will requeue it if needed
+            interview_queue.release(member_id, None)
+    except Exception as e:
+        db.session.rollback()
+        logging.error("Error calling next candidate: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Counts per state and specialist, average wait and interviews per hour"""
+    try:
+        roster.ensure_loaded()
+        return jsonify(_stats_snapshot())
+    except Exception as e:
+        logging.error("Error getting stats: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analytics/transitions', methods=['GET'])
+def get_transition_analytics():
+    """Wait percentiles and interviews per hour per specialist for ?from=&to= (epoch seconds)"""
+    try:
+        end = request.args.get('to', type=int) or int(time.time()) + 1
+        start = request.args.get('from', type=int)
+        if start is None:
+            start = end - HOUR
+        if start >= end:
+            return jsonify({'message': "'from' must be before 'to'"}), 400
+        return jsonify(transition_report(db.session, start, end, request.args.get('specialist')))
+    except Exception as e:
+        logging.error("Error getting transition analytics: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+# Fields owned by the sign-up sheet; state, checkin_time and note are never synced
+SHEET_SYNC_FIELDS = ('name', 'email', 'specialist', 'linkCV')
+SHEET_SYNC_CHUNK = 500
+
+@app.route('/api/members/sync', methods=['POST'])
+def sync_members_from_sheet():
+    """Upsert rows from the sign-up sheet (see import.py --sync) into the live roster"""
+    try:
+        rows = (request.get_json() or {}).get('rows', [])
+
+        def job():
+            mssvs = [row.get('MSSV') for row in rows if row.get('MSSV')]
+            existing = {}
+            for start in range(0, len(mssvs), SHEET_SYNC_CHUNK):
+                chunk = mssvs[start:start + SHEET_SYNC_CHUNK]
+                existing.update((m.MSSV, m) for m in Member.query.filter(Member.MSSV.in_(chunk)))
+
+            added, updated, errors = {}, {}, []
+            previous_specialists = {}
+            unchanged = 0
+            for row in rows:
+                mssv, name = row.get('MSSV'), row.get('name')
+                if not mssv or not name:
+                    errors.append({'row': row, 'message': 'Missing name or MSSV'})
+                    continue
+                member = existing.get(mssv)
+                if member is None:
+                    member = Member(
+                        name=name,
+                        MSSV=mssv,
+                        email=row.get('email'),
+                        specialist=row.get('specialist'),
+                        linkCV=row.get('linkCV'),
+                        state='Chưa checkin',
+                        note='N/A',
+                        source_timestamp=row.get('source_timestamp')
+                    )
+                    db.session.add(member)
+                    existing[mssv] = added[mssv] = member
+                    continue
+                changes = {field: row[field] for field in SHEET_SYNC_FIELDS
+                           if field in row and row[field] != getattr(member, field)}
+                previous_specialists.setdefault(mssv, member.specialist)
+                for field, value in changes.items():
+                    setattr(member, field, value)
+                member.source_timestamp = row.get('source_timestamp', member.source_timestamp)
+                if changes and mssv not in added:
+                    updated[mssv] = member
+                elif not changes:
+                    unchanged += 1
+            db.session.flush()  # assign ids to the new members
+
+            added_data = [serialize_member(m) for m in added.values()]
+            updated_data = [(serialize_member(m), previous_specialists[mssv]) for mssv, m in updated.items()]
+
+            def after_commit():
+                for member_data in added_data:
+                    version = roster.upsert(member_data)
+                    broadcaster.emit('member_added', {**member_data, 'version': version})
+                for member_data, previous_specialist in updated_data:
+                    version = roster.upsert(member_data)
+                    broadcaster.emit('member_edited', {**member_data, 'version': version},
+                                     previous_specialist=previous_specialist)
+                if added_data or updated_data:
+                    stats_broadcaster.changed()
+                logging.info("Sheet sync: %s added, %s updated, %s unchanged, %s errors",
+                             len(added_data), len(updated_data), unchanged, len(errors))
+
+            return WriteOutcome({
+                'added': len(added_data),
+                'updated': len(updated_data),
+                'unchanged': unchanged,
+                'errors': errors
+            }, 200, after_commit)
+
+        outcome = write_pipeline.run(job)
+        return jsonify(outcome.body), outcome.status
+    except Exception as e:
+        db.session.rollback()
+        logging.error("Error syncing members from sheet: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @socketio.on('connect')
-def handle_connect():
+def handle_connect(auth=None):
+    metrics.SOCKETIO_CLIENTS.inc()
     try:
         logging.info("Client connected to SocketIO")
         with app.app_context():
-            members = Member.query.all()
-            member_list = [{
-                'id': member.id,
-                'MSSV': member.MSSV,
-                'name': member.name,
-                'email': member.email,
-                'specialist': member.specialist,
-                'linkCV': member.linkCV,
-                'checkin_time': member.checkin_time,
-                'state': member.state,
-                'note': member.note
-            } for member in members]
-            logging.info(f"Sending members list: {len(member_list)} members")
-            emit('members_list', member_list)
+            # Versioned clients pass {'since': <version or null>} in the connect auth
+            # and only get what they missed; older clients still get members_list
+            # Clients that understand members_batch opt in with {'batch': true}
+            # Screens pick what they receive with {'view': 'desk' | 'interviewer' | 'lobby' | 'admin'}
+            # and, for interviewers, {'specialist': ...}; the default is everything
+            # {'format': 'columns'} sends member lists as {fields, rows} instead of objects
+            auth = auth if isinstance(auth, dict) else {}
+            session['audience'] = audience(auth.get('view'), auth.get('specialist'))
+            session['format'] = auth.get('format') if auth.get('format') in FORMATS else OBJECTS_FORMAT
+            join_room(broadcaster.client_room(session['audience'], auth.get('batch')))
+            if 'since' in auth:
+                payload = scope_sync_payload(session['audience'], roster, _parse_version(auth.get('since')))
+                logging.info("Sending members sync: full=%s, version=%s", payload['full'], payload['version'])
+                emit('members_sync', _encode_sync_payload(payload))
+                return
+            member_list = scope_members(session['audience'], roster.members())
+            logging.info("Sending members list: %s members", len(member_list))
+            emit('members_list', roster.encode_members(member_list, session['format']))
     except Exception as e:
-        logging.error(f"Error during socket connection: {e}")
+        logging.error("Error during socket connection: %s", e)
         emit('error', {'message': f'Internal server error: {str(e)}'})
 
+def _encode_sync_payload(payload):
+    """A members_sync payload with a full snapshot encoded in the client's format"""
+    if not payload['full']:
+        return payload
+    return {**payload, 'members': roster.encode_members(payload['members'], session.get('format', OBJECTS_FORMAT))}
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    metrics.SOCKETIO_CLIENTS.dec()
+
 # Add a socket event handler for client requests
 @socketio.on('request_update')
 def handle_update_request():
     try:
         with app.app_context():
-            members = Member.query.all()
-            member_list = [{
-                'id': member.id,
-                'MSSV': member.MSSV,
-                'name': member.name,
-                'email': member.email,
-                'specialist': member.specialist,
-                'linkCV': member.linkCV,
-                'checkin_time': member.checkin_time,
-                'state': member.state,
-                'note': member.note
-            } for member in members]
-            emit('members_list', member_list)
+            member_list = scope_members(session.get('audience', DEFAULT_AUDIENCE), roster.members())
+            emit('members_list', roster.encode_members(member_list, session.get('format', OBJECTS_FORMAT)))
+    except Exception as e:
+        logging.error("Error handling update request: %s", e)
+        emit('error', {'message': f'Internal server error: {str(e)}'})
+
+@socketio.on('sync')
+def handle_sync(data=None):
+    """Send the changes after the client's version, or a full snapshot if it is too far behind"""
+    try:
+        since = data.get('since_version') if isinstance(data, dict) else data
+        with app.app_context():
+            payload = _encode_sync_payload(
+                scope_sync_payload(session.get('audience', DEFAULT_AUDIENCE), roster, _parse_version(since)))
+        emit('members_sync', payload)
     except Exception as e:
-        logging.error(f"Error handling update request: {e}")
+        logging.error("Error handling sync request: %s", e)
         emit('error', {'message': f'Internal server error: {str(e)}'})
 
 if __name__ == '__main__':
+    from storage import migrate
     with app.app_context():
-        db.create_all()
+        migrate(db.engine)
     # Use threading mode for compatibility
     socketio.run(app, host='0.0.0.0', port=5000, debug=True, use_reloader=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
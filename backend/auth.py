@@ -0,0 +1,99 @@
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HasherBusy(Exception):
+    """More password hashes are queued than the pool accepts; retry later"""
+
+
+class PasswordHasher:
+    """Run pbkdf2 password hashing in a small process pool.
+
+    A hash takes tens of milliseconds of CPU. Done on the request thread, a
+    burst of logins at the start of a shift holds up check-ins and Socket.IO
+    emits; in worker processes it only costs the caller the wait. At most
+    `max_pending` hashes are queued or running: beyond that hash() and
+    verify() raise HasherBusy at once instead of queueing without bound.
+
+    The pool is started on first use, so each gunicorn worker gets its own
+    after the fork, with the spawn start method (the server process has
+    threads of its own that must not be forked). With `workers <= 0` hashing
+    runs inline, as before.
+    """
+
+    def __init__(self, workers=2, max_pending=32, method='pbkdf2:sha256'):
+        self.workers = workers
+        self.method = method
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, method=self.method)
+
+    def verify(self, hashed, password):
+        return self._run(check_password_hash, hashed, password)
+
+    def _run(self, function, *args, **kwargs):
+        if self.workers <= 0:
+            return function(*args, **kwargs)
+        if not self._slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            return self._executor().submit(function, *args, **kwargs).result()
+        finally:
+            self._slots.release()
+
+    def _executor(self):
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        return self._pool
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+class UserCache:
+    """username -> user dict for JWT-protected routes, so a token does not cost a query per request.
+
+    Entries expire after `ttl` seconds and the least recently used are
+    dropped beyond `size`; invalidate() a username whenever its user row
+    changes. Missing users are not cached.
+    """
+
+    def __init__(self, loader, ttl=60, size=1024):
+        self._loader = loader
+        self.ttl = ttl
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # username -> (expires_at, user dict)
+
+    def get(self, username):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(username)
+                return entry[1]
+        user = self._loader(username)
+        if user is not None:
+            with self._lock:
+                self._entries[username] = (now + self.ttl, user)
+                self._entries.move_to_end(username)
+                while len(self._entries) > self.size:
+                    self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, username):
+        with self._lock:
+            self._entries.pop(username, None)
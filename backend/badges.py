@@ -0,0 +1,119 @@
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+try:
+    import segno
+except ImportError:  # QR badges are optional; the endpoints answer 501 without segno
+    segno = None
+
+from streaming import StreamBuffer
+
+# Bump when the badge layout changes, so cached badges are redrawn
+BADGE_LAYOUT = 1
+MODULE = 8   # px per QR module
+BORDER = 4   # quiet zone, in modules
+TEXT_HEIGHT = 72
+
+
+def badge_key(mssv, name):
+    """Cache file name of a badge: changes whenever what is printed on it changes"""
+    digest = hashlib.sha256(f'{BADGE_LAYOUT}\0{mssv}\0{name}'.encode('utf-8')).hexdigest()
+    return f'{digest}.svg'
+
+
+def render_badge(mssv, name):
+    """SVG badge: a QR code of the MSSV (what CheckinQr scans) above the name and MSSV"""
+    qr = segno.make(mssv, error='m')
+    size = qr.symbol_size(scale=1, border=BORDER)[0] * MODULE
+    path = ''.join(f'M{(x + BORDER) * MODULE},{(y + BORDER) * MODULE}h{MODULE}v{MODULE}h-{MODULE}z'
+                   for y, row in enumerate(qr.matrix) for x, dark in enumerate(row) if dark)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size + TEXT_HEIGHT}" '
+            f'viewBox="0 0 {size} {size + TEXT_HEIGHT}">'
+            f'<rect width="100%" height="100%" fill="#fff"/><path fill="#000" d="{path}"/>'
+            f'<text x="50%" y="{size + 24}" font-family="sans-serif" font-size="24" font-weight="bold" '
+            f'text-anchor="middle">{escape(name)}</text>'
+            f'<text x="50%" y="{size + 56}" font-family="monospace" font-size="20" '
+            f'text-anchor="middle">{escape(mssv)}</text></svg>')
+
+
+def _render_to_file(directory, mssv, name):
+    # Runs in a pool process; written under a temporary name so readers never see half a file
+    path = os.path.join(directory, badge_key(mssv, name))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.badge-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(render_badge(mssv, name))
+    os.replace(tmp_path, path)
+    return path
+
+
+class BadgeGenerator:
+    """QR badges for members, drawn in a process pool and cached on disk.
+
+    A badge is cached under a key of the MSSV and name, so later runs only
+    draw members that are new or whose name or MSSV changed. The pool is
+    started on first use with the spawn start method, as PasswordHasher's.
+    """
+
+    def __init__(self, directory, workers=2):
+        self.directory = directory
+        self.workers = workers
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    @property
+    def available(self):
+        return segno is not None
+
+    def _executor(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def generate(self, members):
+        """Start drawing the missing badges of `members`.
+
+        Returns (paths, drawn): paths holds, in member order, the badge
+        path, or a Future of it for badges still being drawn.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        paths, drawn = [], 0
+        for member in members:
+            path = os.path.join(self.directory, badge_key(member['MSSV'], member['name']))
+            if not os.path.exists(path):
+                if self.workers > 0:
+                    path = self._executor().submit(_render_to_file, self.directory, member['MSSV'], member['name'])
+                else:
+                    path = _render_to_file(self.directory, member['MSSV'], member['name'])
+                drawn += 1
+            paths.append(path)
+        return paths, drawn
+
+    def stream_zip(self, members):
+        """Yield a ZIP of the badges of `members` chunk by chunk, drawing missing ones on the way.
+
+        The archive is written to a StreamBuffer, so only one badge is held
+        in memory at a time.
+        """
+        paths, _ = self.generate(members)
+        buffer = StreamBuffer()
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            for member, path in zip(members, paths):
+                if not isinstance(path, str):
+                    path = path.result()
+                with open(path, 'rb') as f:
+                    archive.writestr(f"{member['MSSV'].replace('/', '_')}.svg", f.read())
+                yield buffer.drain()
+        yield buffer.drain()
+
+    def shutdown(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
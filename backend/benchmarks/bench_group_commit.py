@@ -0,0 +1,76 @@
+"""Compare check-in throughput with per-request commits vs group commit.
+
+Usage (from backend/):
+    python benchmarks/bench_group_commit.py --members 2000 --threads 16
+
+Each mode runs against its own temporary SQLite file. Every thread checks in
+its own slice of members through /api/checkin, so both modes do the same
+writes; only the commit strategy differs.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def run(backend, window_ms, members, threads, first_mssv):
+    app, db, Member = backend.app, backend.db, backend.Member
+    backend.write_pipeline.window = window_ms / 1000.0
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.add_all([
+            Member(name=f'Candidate {i}', MSSV=str(first_mssv + i), state='Chưa checkin')
+            for i in range(members)
+        ])
+        db.session.commit()
+    # The table was rebuilt behind the app's back
+    backend.roster.invalidate()
+
+    def worker(offset):
+        client = app.test_client()
+        for i in range(offset, members, threads):
+            response = client.post('/api/checkin', json={'uid': str(first_mssv + i)})
+            assert response.status_code == 200, response.get_json()
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    with app.app_context():
+        checked_in = Member.query.filter_by(state='Đã checkin').count()
+    assert checked_in == members, checked_in
+    return members / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--window-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench-group-commit-')
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    import app as backend
+    logging.disable(logging.CRITICAL)
+
+    # Separate MSSV ranges so the scan debouncer can't answer from the first run
+    single = run(backend, 0, args.members, args.threads, 20230000)
+    grouped = run(backend, args.window_ms, args.members, args.threads, 20240000)
+    print(f"members={args.members} threads={args.threads}")
+    print(f"per-request commit : {single:8.1f} check-ins/s")
+    print(f"group commit ({args.window_ms:g} ms): {grouped:8.1f} check-ins/s  ({grouped / single:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
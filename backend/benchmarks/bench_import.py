@@ -0,0 +1,76 @@
+"""Time the sheet importer in import.py on a synthetic sign-up sheet.
+
+Usage (from backend/):
+    python benchmarks/bench_import.py --rows 10000
+
+Builds a DataFrame shaped like the Google Sheets export (14 columns, ~80%
+'Duyệt', some duplicate MSSVs and blank names) and imports it into a fresh
+temporary SQLite database.
+"""
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import pandas as pd
+
+IMPORT_PY = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'import.py')
+
+SPECIALISTS = ['AI for Automobile', 'Điện - Điện tử', 'Cơ khí', 'Truyền thông', 'Nhân sự']
+FAMILY = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Đặng', 'Vũ', 'Bùi']
+MIDDLE = ['Văn', 'Thị', 'Phúc', 'Duy', 'Minh', 'Hữu', 'Trần Duy']
+GIVEN = ['Nam', 'Minh', 'Tâm', 'Anh', 'Hùng', 'Linh', 'Quân', 'Đức']
+
+
+def load_importer():
+    spec = importlib.util.spec_from_file_location('sheet_import', IMPORT_PY)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_sheet(rows, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(rows):
+        mssv = 20230000 + (rng.randrange(rows) if rng.random() < 0.02 else i)
+        name = '' if rng.random() < 0.01 else f'{rng.choice(FAMILY)} {rng.choice(MIDDLE)} {rng.choice(GIVEN)}'
+        records.append([
+            f'10/1/2025 {i % 24}:00:00', name, mssv, 'CTTN', f'sv{mssv}@sis.hust.edu.vn', '0900000000',
+            'K68', rng.choice(SPECIALISTS), '', f'cv_{mssv}.pdf',
+            f'https://drive.google.com/open?id={mssv:x}{"x" * 40}', '1 MB', 'Không',
+            'Duyệt' if rng.random() < 0.8 else 'Chờ',
+        ])
+    return pd.DataFrame(records, columns=[f'col{c}' for c in range(14)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    importer = load_importer()
+    df = make_sheet(args.rows)
+    timings = []
+    for _ in range(args.repeat):
+        path = os.path.join(tempfile.mkdtemp(prefix='bench-import-'), 'import.db')
+        conn = sqlite3.connect(path)
+        importer.create_table(conn)
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            added, skipped = importer.import_data_from_google_sheet(conn, df)
+        timings.append(time.perf_counter() - started)
+        assert conn.execute('SELECT COUNT(*) FROM Member').fetchone()[0] == added
+        conn.close()
+    print(f"rows={args.rows} added={added} skipped={skipped}")
+    print(f"import: best {min(timings) * 1000:.1f} ms, worst {max(timings) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
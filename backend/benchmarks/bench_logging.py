@@ -0,0 +1,165 @@
+"""Measure what logging adds to each check-in request.
+
+Usage (from backend/):
+    python benchmarks/bench_logging.py --requests 1000 --rounds 3
+
+Checks members in and edits them back, so every request does a write, a
+broadcast and its log records. A test client does not go through engine.io,
+so for each broadcast the engine.io packet log line that a real server
+writes per connected client is logged --clients times. Modes:
+    off         logging disabled, the baseline
+    sync-debug  the old setup: DEBUG written synchronously, Socket.IO loggers on
+    queue-debug logs.configure_logging at DEBUG
+    queue-prod  logs.configure_logging with the gunicorn.conf.py levels
+Log output goes to a temporary file. The time spent in logging calls on the
+request thread is measured directly, as it is small next to the SQLite
+commit that dominates the wall time.
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ('off', 'sync-debug', 'queue-debug', 'queue-prod')
+PRODUCTION_LEVELS = {'socketio.server': 'WARNING', 'engineio.server': 'WARNING'}
+
+
+def configure(backend, mode, log_file):
+    import logs
+    logging.disable(logging.NOTSET)
+    # The old setup logged every engine.io packet
+    backend.socketio.server.eio.logger.every = 1 if mode == 'sync-debug' else backend.app.config['LOG_ENGINEIO_SAMPLE']
+    backend.app.config['LOG_LEVELS'] = {}
+    for name in ('socketio.server', 'engineio.server'):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    if mode == 'off':
+        logging.disable(logging.CRITICAL)
+    elif mode == 'sync-debug':
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handler = logging.StreamHandler(log_file)
+        handler.setFormatter(logging.Formatter(logs.LOG_FORMAT))
+        root.addHandler(handler)
+        root.setLevel(logging.DEBUG)
+        for name in ('socketio.server', 'engineio.server'):
+            logging.getLogger(name).setLevel(logging.INFO)
+    else:
+        backend.app.config['LOG_LEVEL'] = 'DEBUG' if mode == 'queue-debug' else 'INFO'
+        if mode == 'queue-prod':
+            backend.app.config['LOG_LEVELS'] = PRODUCTION_LEVELS
+        sys.stderr, stderr = log_file, sys.stderr
+        try:
+            return logs.configure_logging(backend.app)
+        finally:
+            sys.stderr = stderr
+    return None
+
+
+class LoggingTimer:
+    """Accumulate time spent in logging calls on the benchmark thread"""
+
+    def __init__(self):
+        import logs
+        self.seconds = 0.0
+        self.calls = 0
+        self._thread = threading.get_ident()
+        self._depth = 0
+        self._patched = [(logging.Logger, '_log'), (logs.SampledLogger, 'log')]
+        self._originals = [getattr(cls, name) for cls, name in self._patched]
+
+    def _wrap(self, function):
+        def timed(*args, **kwargs):
+            if threading.get_ident() != self._thread or self._depth:
+                return function(*args, **kwargs)
+            self._depth += 1
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - started
+                self.calls += 1
+                self._depth -= 1
+        return timed
+
+    def __enter__(self):
+        for (cls, name), original in zip(self._patched, self._originals):
+            setattr(cls, name, self._wrap(original))
+        return self
+
+    def __exit__(self, *exc):
+        for (cls, name), original in zip(self._patched, self._originals):
+            setattr(cls, name, original)
+
+
+def setup(backend, count, first_mssv):
+    app, db, Member = backend.app, backend.db, backend.Member
+    with app.app_context():
+        db.create_all()
+        members = [Member(name=f'Candidate {i}', MSSV=str(first_mssv + i), state='Chưa checkin')
+                   for i in range(count)]
+        db.session.add_all(members)
+        db.session.commit()
+        return [(m.id, m.MSSV) for m in members]
+
+
+def run(backend, members, clients):
+    """Return (wall us, logging us, log calls) per request"""
+    client = backend.app.test_client()
+    engineio_logger = backend.socketio.server.eio.logger
+    with LoggingTimer() as timer:
+        started = time.perf_counter()
+        for member_id, mssv in members:
+            response = client.post('/api/checkin', json={'uid': mssv})
+            assert response.status_code == 200, response.get_json()
+            response = client.put(f'/api/members/{member_id}', json={'state': 'Chưa checkin'})
+            assert response.status_code == 200, response.get_json()
+            for sid in range(2 * clients):
+                engineio_logger.info('%s: Sending packet %s data %s', sid, 'MESSAGE',
+                                     '2["member_checked_in",{...}]')
+        elapsed = time.perf_counter() - started
+    requests = 2 * len(members)
+    return elapsed / requests * 1e6, timer.seconds / requests * 1e6, timer.calls / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--clients', type=int, default=50, help="connected Socket.IO clients to simulate")
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench-logging-')
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    # Commit inline so the numbers are not dominated by the batching window
+    os.environ['FLASK_WRITE_BATCH_WINDOW_MS'] = '0'
+    os.environ['FLASK_BROADCAST_BATCH_WINDOW_MS'] = '0'
+    import app as backend
+    members = setup(backend, args.requests, 20230000)
+
+    # Interleave the modes and keep each one's best round, to keep SQLite and
+    # machine noise out of the comparison
+    results = {mode: (float('inf'),) * 3 for mode in MODES}
+    dropped = 0
+    with open(os.path.join(tmpdir, 'bench.log'), 'w') as log_file:
+        for _ in range(args.rounds):
+            for mode in MODES:
+                handler = configure(backend, mode, log_file)
+                results[mode] = min(results[mode], run(backend, members, args.clients), key=lambda r: r[1])
+                dropped += handler.dropped if handler is not None else 0
+        log_size = log_file.tell()
+    logging.disable(logging.CRITICAL)
+
+    print(f"requests={2 * args.requests} x {args.rounds} rounds, clients={args.clients}, "
+          f"log={log_size / 1e6:.1f} MB, dropped={dropped}")
+    for mode, (wall, logging_us, calls) in results.items():
+        print(f"{mode:12s}: {wall:7.1f} us/request, {logging_us:6.1f} us in {calls:4.1f} logging calls")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Check-in latency while volunteers log in all at once.
+
+Usage (from backend/):
+    python benchmarks/bench_login_storm.py --checkins 300 --login-threads 16
+
+One thread checks members in back to back and records each request's
+latency, while --login-threads threads keep calling /api/login. Modes:
+    idle     no logins, the baseline
+    inline   password hashes run on the request threads (the old behaviour)
+    pool     password hashes run in the PasswordHasher process pool
+Logins that find the hashing queue full get a 503 and are counted as shed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = ('idle', 'inline', 'pool')
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000
+
+
+def setup(backend, checkins, users, first_mssv):
+    app, db, Member = backend.app, backend.db, backend.Member
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([Member(name=f'Candidate {i}', MSSV=str(first_mssv + i), state='Chưa checkin')
+                            for i in range(max(checkins, users))])
+        db.session.commit()
+    client = app.test_client()
+    for i in range(users):
+        response = client.post('/api/register', json={'username': f'volunteer{i}', 'password': 'secret',
+                                                      'MSSV': str(first_mssv + i)})
+        assert response.status_code == 201, response.get_json()
+
+
+def run(backend, mode, checkins, login_threads, users, first_mssv):
+    """Return (check-in latencies, logins answered, logins shed)"""
+    backend.password_hasher.workers = 0 if mode == 'inline' else backend.app.config['PASSWORD_HASH_WORKERS']
+    client = backend.app.test_client()
+    stop = threading.Event()
+    logins = {'ok': 0, 'shed': 0}
+
+    def login_storm(n):
+        login_client = backend.app.test_client()
+        while not stop.is_set():
+            response = login_client.post('/api/login', json={'username': f'volunteer{n % users}',
+                                                             'password': 'secret'})
+            logins['ok' if response.status_code == 200 else 'shed'] += 1
+
+    storm = [threading.Thread(target=login_storm, args=(n,)) for n in range(login_threads if mode != 'idle' else 0)]
+    for thread in storm:
+        thread.start()
+    time.sleep(0.5)  # let the storm build up
+
+    latencies = []
+    for i in range(checkins):
+        mssv = str(first_mssv + i)
+        started = time.perf_counter()
+        response = client.post('/api/checkin', json={'uid': mssv})
+        latencies.append(time.perf_counter() - started)
+        assert response.status_code == 200, response.get_json()
+        # Back to waiting so every mode does the same writes
+        client.put(f'/api/members/{backend.mssv_index.get(mssv)}', json={'state': 'Chưa checkin'})
+
+    stop.set()
+    for thread in storm:
+        thread.join()
+    return latencies, logins['ok'], logins['shed']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--checkins', type=int, default=300)
+    parser.add_argument('--login-threads', type=int, default=16)
+    parser.add_argument('--users', type=int, default=20)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix='bench-login-')
+    os.environ['FLASK_SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    os.environ['FLASK_LOG_LEVEL'] = 'WARNING'
+    os.environ['FLASK_CHECKIN_DEBOUNCE_SECONDS'] = '0'
+    import app as backend
+    first_mssv = 20230000
+    setup(backend, args.checkins, args.users, first_mssv)
+
+    print(f"checkins={args.checkins}, login threads={args.login_threads}, "
+          f"hash workers={backend.app.config['PASSWORD_HASH_WORKERS']}, cpus={os.cpu_count()}")
+    try:
+        for mode in MODES:
+            started = time.perf_counter()
+            latencies, answered, shed = run(backend, mode, args.checkins, args.login_threads, args.users, first_mssv)
+            elapsed = time.perf_counter() - started
+            print(f"{mode:7s}: check-in p50 {percentile(latencies, 50):7.1f} ms, p99 {percentile(latencies, 99):7.1f} ms, "
+                  f"max {max(latencies) * 1000:7.1f} ms; logins {answered / elapsed:5.1f}/s answered, {shed} shed")
+    finally:
+        backend.password_hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""Load test: check-in bursts, interview transitions and Socket.IO fan-out.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --members 2000 --clients 50 --concurrency 32
+    python benchmarks/load_test.py --server gunicorn --compare benchmarks/results/<earlier run>.json
+
+Starts the backend on a free port against a temporary SQLite database seeded
+with --members candidates, connects --clients Socket.IO clients the way the
+dashboard does ({batch: true}, or one event per change with --legacy-clients),
+then replays:
+    checkin      every candidate scanned once, alternating between the desk
+                 (/api/checkin) and the card readers (/api/esp/checkin), with
+                 --duplicates of the scans repeated as a reader does
+    transitions  every candidate moved Gọi PV -> Đang phỏng vấn -> Đã phỏng vấn
+                 with PUT /api/members/<id>
+For each phase it reports throughput, p50/p99 request latency and the time
+from sending a request to each client receiving the resulting member event.
+Results are saved as JSON in benchmarks/results/; --compare prints the change
+against an earlier run.
+
+Needs the Socket.IO client: pip install "python-socketio[client]"
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import socketio
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmarks', 'results')
+
+MEMBER_EVENTS = ('member_checked_in', 'member_interview_called',
+                 'member_interview_started', 'member_interview_ended')
+TRANSITIONS = (('Gọi PV', 'member_interview_called'),
+               ('Đang phỏng vấn', 'member_interview_started'),
+               ('Đã phỏng vấn', 'member_interview_ended'))
+
+
+def percentiles(samples):
+    """p50/p99/max of `samples` (seconds), in milliseconds"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+
+    def at(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] * 1000, 2)
+    return {'p50': at(50), 'p99': at(99), 'max': round(ordered[-1] * 1000, 2)}
+
+
+class Server:
+    """The backend in a subprocess, on a free port, with a throwaway database"""
+
+    def __init__(self, mode, workers, members):
+        self.tmpdir = tempfile.mkdtemp(prefix='load-test-')
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            self.port = s.getsockname()[1]
+        self.url = f'http://127.0.0.1:{self.port}'
+        self.env = {
+            **os.environ,
+            'PORT': str(self.port),
+            'DATABASE_URL': f"sqlite:///{os.path.join(self.tmpdir, 'load.db')}",
+            'WEB_CONCURRENCY': str(workers),
+            # Production log levels, as in gunicorn.conf.py
+            'FLASK_LOG_LEVEL': 'INFO',
+            'FLASK_LOG_LEVELS': '{"socketio.server": "WARNING", "engineio.server": "WARNING"}',
+        }
+        subprocess.run([sys.executable, '-c', 'from wsgi import init_db; init_db()'],
+                       cwd=BACKEND_DIR, env=self.env, check=True, capture_output=True)
+        self.members = self._seed(members)
+        if mode == 'gunicorn':
+            command = ['gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app']
+        else:
+            command = [sys.executable, 'wsgi.py']
+        self.log = open(os.path.join(self.tmpdir, 'server.log'), 'w')
+        self.process = subprocess.Popen(command, cwd=BACKEND_DIR, env=self.env,
+                                        stdout=self.log, stderr=subprocess.STDOUT)
+        self._wait_ready()
+
+    def _seed(self, count):
+        conn = sqlite3.connect(os.path.join(self.tmpdir, 'load.db'))
+        with conn:
+            conn.executemany(
+                "INSERT INTO Member (name, MSSV, email, specialist, state, note) VALUES (?, ?, ?, ?, ?, ?)",
+                [(f'Ứng viên {i}', str(30000000 + i), f'{30000000 + i}@example.com',
+                  ('Tech', 'Media', 'Event', 'HR')[i % 4], 'Chưa checkin', 'N/A') for i in range(count)])
+        members = conn.execute('SELECT id, MSSV FROM Member ORDER BY id').fetchall()
+        conn.close()
+        return members
+
+    def _wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited, see {self.log.name}")
+            try:
+                requests.get(f'{self.url}/api/members', timeout=1).raise_for_status()
+                return
+            except requests.RequestException:
+                time.sleep(0.2)
+        raise RuntimeError(f"Server did not start in {timeout}s, see {self.log.name}")
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+class Dashboards:
+    """N Socket.IO clients recording when each member event reaches them"""
+
+    def __init__(self, url, count, batch):
+        self.received = []  # (client, member id, event, perf_counter)
+        self.clients = []
+        for n in range(count):
+            client = socketio.Client(reconnection=False)
+            self._subscribe(client, n)
+            client.connect(url, auth={'batch': batch}, transports=['websocket'], wait_timeout=10)
+            self.clients.append(client)
+
+    def _subscribe(self, client, n):
+        received = self.received
+
+        def on_batch(data):
+            now = time.perf_counter()
+            for update in data['updates']:
+                for event in update['events']:
+                    received.append((n, update['member']['id'], event, now))
+        client.on('members_batch', on_batch)
+
+        for event in MEMBER_EVENTS:
+            client.on(event, lambda data, event=event: received.append((n, data['id'], event, time.perf_counter())))
+
+    def collect(self, sent, timeout):
+        """Latencies from `sent` {(member id, event): send time} to every client's receipt"""
+        expected = len(sent) * len(self.clients)
+        deadline = time.monotonic() + timeout
+        while len(self.received) < expected and time.monotonic() < deadline:
+            time.sleep(0.05)
+        received, self.received[:] = list(self.received), []
+        latencies = [at - sent[(member_id, event)] for _, member_id, event, at in received
+                     if (member_id, event) in sent]
+        return latencies, (len(latencies) / expected if expected else 1.0)
+
+    def close(self):
+        for client in self.clients:
+            client.disconnect()
+
+
+def run_phase(url, jobs, concurrency):
+    """Run `jobs` [(method, path, body, broadcast key or None)] concurrently.
+
+    Returns (wall seconds, request latencies, error count, {key: send time}).
+    """
+    local = threading.local()
+    sent = {}
+
+    def call(job):
+        method, path, body, key = job
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        if key is not None:
+            sent.setdefault(key, started)
+        try:
+            response = session.request(method, url + path, json=body, timeout=30)
+            ok = response.status_code == 200
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, jobs))
+    wall = time.perf_counter() - started
+    return wall, [latency for latency, _ in results], sum(1 for _, ok in results if not ok), sent
+
+
+def checkin_jobs(members, duplicates):
+    jobs = []
+    for n, (member_id, mssv) in enumerate(members):
+        if n % 2:
+            job = ('POST', '/api/esp/checkin', {'MSSV': mssv}, (member_id, 'member_checked_in'))
+        else:
+            job = ('POST', '/api/checkin', {'uid': mssv}, (member_id, 'member_checked_in'))
+        jobs.append(job)
+        if random.random() < duplicates:
+            jobs.append(job[:3] + (None,))
+    return jobs
+
+
+def transition_jobs(members):
+    # One step at a time across all members so each PUT is a real transition
+    return [[('PUT', f'/api/members/{member_id}', {'state': state}, (member_id, event))
+             for member_id, _ in members]
+            for state, event in TRANSITIONS]
+
+
+def summarize(wall, latencies, errors, delivery, delivered):
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput': round(len(latencies) / wall, 1),
+        'latency_ms': percentiles(latencies),
+        'delivery_ms': percentiles(delivery),
+        'delivered': round(delivered, 4),
+    }
+
+
+def git_version():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(result, previous):
+    print(f"\nvs {previous['version']} ({previous['time']}):")
+    for phase, now in result['phases'].items():
+        before = previous['phases'].get(phase)
+        if not before:
+            continue
+        rows = [('throughput', before['throughput'], now['throughput'])]
+        for metric in ('latency_ms', 'delivery_ms'):
+            for p in ('p50', 'p99'):
+                if before[metric] and now[metric]:
+                    rows.append((f'{metric[:-3]} {p}', before[metric][p], now[metric][p]))
+        for name, old, new in rows:
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            print(f"  {phase:12s} {name:15s} {old:10.1f} -> {new:10.1f}  ({change})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--members', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=20, help="connected Socket.IO dashboards")
+    parser.add_argument('--concurrency', type=int, default=16, help="requests in flight")
+    parser.add_argument('--duplicates', type=float, default=0.1, help="fraction of scans repeated")
+    parser.add_argument('--legacy-clients', action='store_true', help="clients without members_batch")
+    parser.add_argument('--server', choices=('dev', 'gunicorn'), default='dev')
+    parser.add_argument('--workers', type=int, default=1, help="gunicorn workers (more need Redis)")
+    parser.add_argument('--delivery-timeout', type=float, default=30)
+    parser.add_argument('--compare', metavar='RESULT_JSON')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    server = Server(args.server, args.workers, args.members)
+    dashboards = None
+    try:
+        dashboards = Dashboards(server.url, args.clients, batch=not args.legacy_clients)
+        phases = {}
+
+        wall, latencies, errors, sent = run_phase(server.url, checkin_jobs(server.members, args.duplicates),
+                                                  args.concurrency)
+        delivery, delivered = dashboards.collect(sent, args.delivery_timeout)
+        phases['checkin'] = summarize(wall, latencies, errors, delivery, delivered)
+
+        wall, latencies, errors, sent = 0.0, [], 0, {}
+        for step in transition_jobs(server.members):
+            step_wall, step_latencies, step_errors, step_sent = run_phase(server.url, step, args.concurrency)
+            wall, errors = wall + step_wall, errors + step_errors
+            latencies.extend(step_latencies)
+            sent.update(step_sent)
+        delivery, delivered = dashboards.collect(sent, args.delivery_timeout)
+        phases['transitions'] = summarize(wall, latencies, errors, delivery, delivered)
+    finally:
+        if dashboards is not None:
+            dashboards.close()
+        server.stop()
+
+    result = {
+        'version': git_version(),
+        'time': datetime.datetime.now().isoformat(timespec='seconds'),
+        'config': vars(args),
+        'phases': phases,
+    }
+    for phase, summary in phases.items():
+        latency, delivery = summary['latency_ms'], summary['delivery_ms'] or {}
+        print(f"{phase:12s}: {summary['requests']} requests, {summary['errors']} errors, "
+              f"{summary['throughput']:.1f} req/s, latency p50 {latency['p50']} ms p99 {latency['p99']} ms, "
+              f"delivery p50 {delivery.get('p50')} ms p99 {delivery.get('p99')} ms "
+              f"({summary['delivered']:.1%} delivered)")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"load-{time.strftime('%Y%m%d-%H%M%S')}-{result['version']}.json")
+    with open(path, 'w') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Saved {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(result, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import threading
+
+from metrics import BROADCAST_SECONDS
+
+# Member updates that can be delayed and merged into one members_batch frame
+BATCHED_EVENTS = (
+    'member_checked_in',
+    'member_edited',
+    'member_interview_called',
+    'member_interview_started',
+    'member_interview_ended',
+)
+
+# What a client subscribes to, with {'view': ..., 'specialist': ...} in the
+# connect auth. Clients that don't say get the admin view: everything.
+VIEWS = ('admin', 'desk', 'interviewer', 'lobby')
+DEFAULT_VIEW = 'admin'
+DEFAULT_AUDIENCE = f'view:{DEFAULT_VIEW}'
+# The check-in desk only follows who exists and who has checked in
+DESK_EVENTS = frozenset(('member_added', 'member_edited', 'member_deleted', 'member_checked_in'))
+# Lobby displays show names and states, and never get contact details or notes
+LOBBY_AUDIENCE = 'view:lobby'
+LOBBY_FIELDS = ('id', 'name', 'state', 'version')
+SPECIALIST_PREFIX = 'specialist:'
+# Audiences that get every member change can catch up from the roster
+# changelog; the others only see part of it and always get a full snapshot
+DELTA_AUDIENCES = (DEFAULT_AUDIENCE, 'view:interviewer', LOBBY_AUDIENCE)
+
+BATCH_MODE = 'batch'
+LEGACY_MODE = 'legacy'
+
+
+def audience(view, specialist=None):
+    """The audience (room, apart from the batch/legacy mode) of a subscription"""
+    if view not in VIEWS:
+        view = DEFAULT_VIEW
+    if view == 'interviewer' and specialist:
+        return f'{SPECIALIST_PREFIX}{specialist}'
+    return f'view:{view}'
+
+
+def room(mode, audience_name):
+    return f'{mode}|{audience_name}'
+
+
+def project_for(audience_name, member):
+    """The part of a member dict (or event payload) an audience may see"""
+    if audience_name != LOBBY_AUDIENCE:
+        return member
+    return {field: member[field] for field in LOBBY_FIELDS if field in member}
+
+
+def scope_members(audience_name, members):
+    """The initial member list of an audience"""
+    if audience_name.startswith(SPECIALIST_PREFIX):
+        specialist = audience_name[len(SPECIALIST_PREFIX):]
+        return [member for member in members if member.get('specialist') == specialist]
+    if audience_name == LOBBY_AUDIENCE:
+        return [project_for(audience_name, member) for member in members]
+    return members
+
+
+def scope_sync_payload(audience_name, roster, since):
+    """roster.sync_payload(since), limited to what an audience may see"""
+    if audience_name not in DELTA_AUDIENCES:
+        since = None
+    payload = roster.sync_payload(since)
+    if payload['full']:
+        return {**payload, 'members': scope_members(audience_name, payload['members'])}
+    if audience_name == LOBBY_AUDIENCE:
+        changes = [{**change, 'member': project_for(audience_name, change['member'])}
+                   if change['type'] == 'upsert' else change for change in payload['changes']]
+        return {**payload, 'changes': changes}
+    return payload
+
+
+def _wants(audience_name, event):
+    return audience_name != 'view:desk' or event in DESK_EVENTS
+
+
+def _audiences(event, specialists):
+    audiences = [DEFAULT_AUDIENCE, 'view:interviewer', LOBBY_AUDIENCE]
+    audiences.extend(f'{SPECIALIST_PREFIX}{specialist}' for specialist in specialists if specialist)
+    if event in DESK_EVENTS:
+        audiences.append('view:desk')
+    return audiences
+
+
+class BroadcastBatcher:
+    """Route member_* broadcasts to the audiences that need them, coalescing bursts.
+
+    Every client joins one room: its audience (admin, desk, interviewers of
+    all or of one specialist, lobby) in batch or legacy mode. An event only
+    goes to the audiences that need it: the desk gets no interview events,
+    a specialist's interviewers only get members of that specialist (or
+    moved away from it), and the lobby gets id, name and state only.
+
+    Clients that connect with {'batch': true} receive one members_batch frame
+    per window and audience, holding the latest payload for each member id
+    plus the ordered list of events that happened to it. Legacy clients keep
+    receiving one event per change. member_added and member_deleted are
+    always sent immediately, after flushing the pending updates, so batch
+    clients see versions in order.
+
+    With `window_ms <= 0` batching is off and every client is a legacy client.
+    """
+
+    def __init__(self, socketio, window_ms=50):
+        self.socketio = socketio
+        self.window = window_ms / 1000.0
+        self._lock = threading.Lock()
+        # Held while a pending batch is taken and sent, and around immediate
+        # events, so batch clients never get a newer version before an older one
+        self._emit_lock = threading.RLock()
+        self._pending = {}
+        self._scheduled = False
+
+    @property
+    def enabled(self):
+        return self.window > 0
+
+    def client_room(self, audience_name, batch=False):
+        """The room a client of `audience_name` joins"""
+        return room(BATCH_MODE if self.enabled and batch else LEGACY_MODE, audience_name)
+
+    def emit(self, event, data, previous_specialist=None):
+        """Broadcast a member event; pass the member's previous specialist if it changed
+        (and for deletions, whose payload has none)"""
+        audiences = _audiences(event, {data.get('specialist'), previous_specialist})
+        batched = self.enabled and event in BATCHED_EVENTS
+        if not batched:
+            # Batch clients must get the pending (older) versions first, or a
+            # client that reconnects in between resumes past changes it never saw
+            with self._emit_lock:
+                self.flush()
+                self._emit_to(event, data, audiences, (LEGACY_MODE, BATCH_MODE))
+            return
+        self._emit_to(event, data, audiences, (LEGACY_MODE,))
+
+        with self._lock:
+            update = self._pending.pop(data['id'], None)
+            events = update['events'] if update else []
+            if event not in events:
+                events.append(event)
+            targets = update['audiences'] if update else set()
+            targets.update(audiences)
+            # Re-insert so the frame is ordered by each member's last change
+            self._pending[data['id']] = {'member': data, 'events': events, 'audiences': targets}
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.socketio.start_background_task(self._flush_later)
+
+    def emit_many(self, event, items):
+        """Broadcast one event for many members; batch clients get them in a single frame now"""
+        for data in items:
+            self.emit(event, data)
+        if self.enabled and event in BATCHED_EVENTS:
+            self.flush()
+
+    def _emit_to(self, event, data, audiences, modes):
+        full = [room(mode, name) for name in audiences
+                if name != LOBBY_AUDIENCE and _wants(name, event) for mode in modes]
+        if full:
+            self._emit(event, data, to=full)
+        if LOBBY_AUDIENCE in audiences:
+            self._emit(event, project_for(LOBBY_AUDIENCE, data), to=[room(mode, LOBBY_AUDIENCE) for mode in modes])
+
+    def _flush_later(self):
+        self.socketio.sleep(self.window)
+        self.flush()
+
+    def flush(self):
+        with self._emit_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                self._scheduled = False
+            if pending:
+                self._emit_batches(pending)
+
+    def _emit_batches(self, pending):
+        frames = {}
+        for update in pending.values():
+            for name in update['audiences']:
+                events = [event for event in update['events'] if _wants(name, event)]
+                if events:
+                    frames.setdefault(name, []).append(
+                        {'member': project_for(name, update['member']), 'events': events})
+        for name, updates in frames.items():
+            version = max(update['member'].get('version', 0) for update in updates)
+            self._emit('members_batch', {'version': version, 'updates': updates}, to=room(BATCH_MODE, name))
+
+    def _emit(self, event, data, **kwargs):
+        with BROADCAST_SECONDS.time(event):
+            self.socketio.emit(event, data, **kwargs)
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MssvIndex:
+    """MSSV -> member id map, kept in step with the roster as a RosterCache listener"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = {}
+        self._mssv = {}
+
+    def reset(self, members):
+        with self._lock:
+            self._ids = {m['MSSV']: m['id'] for m in members}
+            self._mssv = {m['id']: m['MSSV'] for m in members}
+
+    def update(self, member_id, member_data):
+        with self._lock:
+            old = self._mssv.pop(member_id, None)
+            if old is not None and self._ids.get(old) == member_id:
+                del self._ids[old]
+            if member_data is not None:
+                self._ids[member_data['MSSV']] = member_id
+                self._mssv[member_id] = member_data['MSSV']
+
+    def get(self, mssv):
+        return self._ids.get(mssv)
+
+
+class CheckinDebouncer:
+    """Collapse repeated scans of the same card into the first one.
+
+    A scan that arrives while the first is still being processed waits for
+    it, and a successful check-in is remembered for `window` seconds; both
+    get the original result back without touching the database or
+    broadcasting again. Failed check-ins are not remembered.
+    """
+
+    PRUNE_SIZE = 1024
+
+    def __init__(self, window=3.0):
+        self.window = window
+        self._lock = threading.Lock()
+        self._recent = {}  # MSSV -> (expires_at or None while in flight, Future)
+
+    def run(self, mssv, checkin):
+        """Return (outcome, duplicate) for `checkin()` debounced on `mssv`"""
+        if self.window <= 0:
+            return checkin(), False
+        now = time.monotonic()
+        with self._lock:
+            entry = self._recent.get(mssv)
+            if entry is not None and (entry[0] is None or entry[0] > now):
+                future, owner = entry[1], False
+            else:
+                future, owner = Future(), True
+                self._recent[mssv] = (None, future)
+                if len(self._recent) > self.PRUNE_SIZE:
+                    self._prune(now)
+        if not owner:
+            return future.result(), True
+
+        try:
+            outcome = checkin()
+        except Exception as e:
+            with self._lock:
+                self._recent.pop(mssv, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if outcome.status == 200:
+                self._recent[mssv] = (time.monotonic() + self.window, future)
+            else:
+                self._recent.pop(mssv, None)
+        future.set_result(outcome)
+        return outcome, False
+
+    def recent(self, mssv):
+        """The remembered outcome of a check-in of `mssv` within the window, or None.
+
+        For paths that cannot wait in run(), like a batch applied in one
+        transaction; a check-in still in flight is not returned.
+        """
+        with self._lock:
+            entry = self._recent.get(mssv)
+            if entry is None or entry[0] is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1].result()
+
+    def remember(self, mssv, outcome):
+        """Remember a successful check-in made outside run() for the window"""
+        if self.window <= 0:
+            return
+        future = Future()
+        future.set_result(outcome)
+        with self._lock:
+            entry = self._recent.get(mssv)
+            if entry is None or entry[0] is not None:
+                self._recent[mssv] = (time.monotonic() + self.window, future)
+
+    def forget(self, mssv):
+        """Drop the remembered result, e.g. after the member was edited"""
+        with self._lock:
+            entry = self._recent.get(mssv)
+            if entry is not None and entry[0] is not None:
+                del self._recent[mssv]
+
+    def _prune(self, now):
+        for mssv, (expires_at, _) in list(self._recent.items()):
+            if expires_at is not None and expires_at <= now:
+                del self._recent[mssv]
@@ -0,0 +1,290 @@
+import hashlib
+import http.client
+import ipaddress
+import json
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from interview_queue import WAITING_STATE
+
+# Drive share links open a viewer page; this form returns the file itself
+_DRIVE_ID = re.compile(r'drive\.google\.com/(?:file/d/|open\?id=|uc\?(?:[^#]*&)?id=)([\w-]+)')
+DRIVE_DOWNLOAD_URL = 'https://drive.google.com/uc?export=download&id={}'
+CHUNK_SIZE = 64 * 1024
+# linkCV comes from the sign-up sheet, so applicants choose what is fetched
+ALLOWED_SCHEMES = ('http', 'https')
+# Served inline; anything else (HTML, SVG, ...) is sent as an attachment so a
+# remote host cannot serve active content from the API origin
+INLINE_CONTENT_TYPES = frozenset(('application/pdf', 'image/png', 'image/jpeg', 'image/gif', 'image/webp'))
+
+
+class CvFetchError(Exception):
+    """The CV could not be downloaded from its host"""
+
+
+def download_url(link):
+    """The URL to download a linkCV from"""
+    match = _DRIVE_ID.search(link)
+    return DRIVE_DOWNLOAD_URL.format(match.group(1)) if match else link
+
+
+def inline_content_type(content_type):
+    """The media type of `content_type` if it may be served inline, else None"""
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    return media_type if media_type in INLINE_CONTENT_TYPES else None
+
+
+def _check_scheme(url):
+    if urllib.parse.urlsplit(url).scheme.lower() not in ALLOWED_SCHEMES:
+        raise CvFetchError(f"Only {' and '.join(ALLOWED_SCHEMES)} links are fetched")
+
+
+def _is_public(address):
+    ip = ipaddress.ip_address(address.split('%')[0])
+    if ip.version == 6 and ip.ipv4_mapped:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def _connector(allow_private):
+    """socket.create_connection that resolves the host once, refuses non-public
+    addresses unless `allow_private`, and connects to exactly what it checked"""
+    def create_connection(address, timeout=None, source_address=None):
+        host, port = address
+        try:
+            addresses = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror as e:
+            raise CvFetchError(f"Cannot resolve {host}: {e}") from e
+        if not allow_private:
+            for *_, sockaddr in addresses:
+                if not _is_public(sockaddr[0]):
+                    raise CvFetchError(f"Refusing to fetch from {host}: {sockaddr[0]} is not a public address")
+        error = None
+        for family, kind, proto, _, sockaddr in addresses:
+            sock = socket.socket(family, kind, proto)
+            try:
+                sock.settimeout(timeout)
+                if source_address:
+                    sock.bind(source_address)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as e:
+                sock.close()
+                error = e
+        raise error
+    return create_connection
+
+
+class _RedirectHandler(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        _check_scheme(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def _opener(allow_private):
+    """A urllib opener for http(s) only: no file:, ftp: or data: handlers and no
+    proxies, and every connection (redirects included) goes through _connector"""
+    create_connection = _connector(allow_private)
+
+    class Connection(http.client.HTTPConnection):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._create_connection = create_connection
+
+    class SecureConnection(http.client.HTTPSConnection):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._create_connection = create_connection
+
+    class Handler(urllib.request.HTTPHandler):
+        def http_open(self, req):
+            return self.do_open(Connection, req)
+
+    class SecureHandler(urllib.request.HTTPSHandler):
+        def https_open(self, req):
+            return self.do_open(SecureConnection, req, context=self._context)
+
+    opener = urllib.request.OpenerDirector()
+    for handler in (Handler(), SecureHandler(), _RedirectHandler(),
+                    urllib.request.HTTPDefaultErrorHandler(), urllib.request.HTTPErrorProcessor()):
+        opener.add_handler(handler)
+    return opener
+
+
+class CvCache:
+    """linkCV documents cached on local disk, least recently used evicted first.
+
+    Each document is stored as <sha256 of the link> with a .json sidecar
+    holding its content type, and is written to a temporary file first, so
+    readers (and other worker processes sharing the directory) never see a
+    partial download. The total size is kept under `max_bytes`; single
+    documents over `max_file_bytes` are refused.
+
+    prefetch() downloads in a background thread pool and get() waits for a
+    download already in progress instead of starting a second one. As a
+    RosterCache listener, it prefetches the CV of every member who reaches
+    Đã checkin, so it is on disk by the time they are called.
+
+    Links are applicant input: only http(s) URLs are fetched, and neither
+    they nor their redirects may reach a loopback, private or link-local
+    address unless `allow_private` is set (for a CV host on the LAN).
+    """
+
+    def __init__(self, directory, max_bytes=500 * 1024 * 1024, max_file_bytes=20 * 1024 * 1024,
+                 workers=4, timeout=20, allow_private=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.timeout = timeout
+        self.workers = workers
+        self.allow_private = allow_private
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._size = 0
+        self._inflight = {}  # key -> Future
+        self._pool = None
+        self._loaded = False
+
+    def _path(self, key):
+        return os.path.join(self.directory, key)
+
+    def _load(self):
+        # Adopt what a previous run (or another worker) left on disk, oldest access first
+        os.makedirs(self.directory, exist_ok=True)
+        files = []
+        for name in os.listdir(self.directory):
+            path = self._path(name)
+            if len(name) == 64 and os.path.exists(path + '.json'):
+                stat = os.stat(path)
+                files.append((stat.st_atime, name, stat.st_size))
+        for _, name, size in sorted(files):
+            self._entries[name] = size
+            self._size += size
+        self._loaded = True
+
+    def _lookup(self, key):
+        """(path, content type) if `key` is on disk, marking it recently used"""
+        if not self._loaded:
+            self._load()
+        path = self._path(key)
+        try:
+            with open(path + '.json') as f:
+                content_type = json.load(f)['content_type']
+            size = os.path.getsize(path)
+        except (OSError, ValueError, KeyError):
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            return None
+        if key not in self._entries:
+            self._size += size
+        self._entries[key] = size
+        self._entries.move_to_end(key)
+        return path, content_type
+
+    def get(self, link):
+        """(path, content type) of the cached document, downloading it if needed"""
+        key = hashlib.sha256(link.encode('utf-8')).hexdigest()
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                try:
+                    os.utime(cached[0])  # the access time orders the LRU after a restart
+                except OSError:
+                    pass
+                return cached
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if owner:
+            try:
+                future.set_result(self._download(key, link))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+        return future.result()
+
+    def prefetch(self, link):
+        """Download `link` in the background unless it is cached or already downloading"""
+        if self.workers <= 0:
+            return
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='cv-prefetch')
+        self._pool.submit(self._prefetch, link)
+
+    def _prefetch(self, link):
+        try:
+            self.get(link)
+        except Exception as e:
+            logging.warning("CV prefetch failed for %s: %s", link, e)
+
+    def _download(self, key, link):
+        url = download_url(link)
+        _check_scheme(url)
+        request = urllib.request.Request(url, headers={'User-Agent': 'memberlist-cv-cache'})
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix='.download-')
+        try:
+            with os.fdopen(fd, 'wb') as out, \
+                    _opener(self.allow_private).open(request, timeout=self.timeout) as response:
+                content_type = response.headers.get('Content-Type', 'application/octet-stream')
+                size = 0
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > self.max_file_bytes:
+                        raise CvFetchError(f"CV is larger than {self.max_file_bytes} bytes")
+                    out.write(chunk)
+            path = self._path(key)
+            with open(tmp_path + '.json', 'w') as f:
+                json.dump({'link': link, 'content_type': content_type}, f)
+            os.replace(tmp_path, path)
+            os.replace(tmp_path + '.json', path + '.json')
+        except CvFetchError:
+            raise
+        except OSError as e:  # URLError and HTTPError included
+            raise CvFetchError(str(e)) from e
+        finally:
+            for leftover in (tmp_path, tmp_path + '.json'):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)
+            self._entries[key] = size
+            self._size += size
+            self._evict()
+        return path, content_type
+
+    def _evict(self):
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._size -= size
+            for path in (self._path(key), self._path(key) + '.json'):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    # RosterCache listener interface
+    def reset(self, members):
+        for member in members:
+            self.update(member['id'], member)
+
+    def update(self, member_id, member_data):
+        if member_data is not None and member_data.get('state') == WAITING_STATE and member_data.get('linkCV'):
+            self.prefetch(member_data['linkCV'])
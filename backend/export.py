@@ -0,0 +1,106 @@
+import csv
+import io
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from streaming import StreamBuffer
+
+CSV_MIMETYPE = 'text/csv; charset=utf-8'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+EXPORT_FORMATS = {'csv': CSV_MIMETYPE, 'xlsx': XLSX_MIMETYPE}
+
+# Control characters XML 1.0 cannot carry, even escaped
+_XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# The fixed parts of a one-sheet workbook. Cells use inline strings, so no
+# shared string table has to be built (and held) before the sheet is written.
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Members" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'),
+}
+_SHEET_HEAD = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+               '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+_SHEET_TAIL = '</sheetData></worksheet>'
+
+
+def stream_csv(fields, batches):
+    """Yield a CSV file chunk by chunk: the header, then one chunk per batch of rows.
+
+    Starts with a UTF-8 BOM so Excel reads Vietnamese names correctly.
+    """
+    out = io.StringIO()
+    writer = csv.writer(out)
+    out.write('\ufeff')
+    writer.writerow(fields)
+    yield out.getvalue().encode('utf-8')
+    for rows in batches:
+        out.seek(0)
+        out.truncate()
+        writer.writerows(rows)
+        yield out.getvalue().encode('utf-8')
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f'<c><v>{value}</v></c>'
+    text = escape(_XML_ILLEGAL.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _xlsx_rows(rows):
+    return ''.join(f'<row>{"".join(_xlsx_cell(value) for value in row)}</row>' for row in rows)
+
+
+def stream_xlsx(fields, batches):
+    """Yield a one-sheet XLSX workbook chunk by chunk, one chunk per batch of rows.
+
+    The sheet is deflated straight into a StreamBuffer, so memory stays at
+    one batch whatever the number of rows.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((_SHEET_HEAD + _xlsx_rows([fields])).encode('utf-8'))
+            yield buffer.drain()
+            for rows in batches:
+                sheet.write(_xlsx_rows(rows).encode('utf-8'))
+                yield buffer.drain()
+            sheet.write(_SHEET_TAIL.encode('utf-8'))
+    yield buffer.drain()
+
+
+def stream_export(fmt, fields, batches):
+    """Yield `batches` of rows (sequences in `fields` order) as a file in `fmt`, one of EXPORT_FORMATS"""
+    if fmt == 'xlsx':
+        return stream_xlsx(fields, batches)
+    return stream_csv(fields, batches)
@@ -0,0 +1,44 @@
+# Production server: gunicorn -c gunicorn.conf.py wsgi:app
+#
+# Each worker is a gevent (greenlet) server, so a slow request no longer holds
+# up everyone. One worker is the default: gunicorn has no sticky sessions, and
+# a client that falls back to long-polling (captive proxies, the frontend's
+# 'polling' transport) gets "Invalid session" errors when its requests land on
+# different workers. Only raise WEB_CONCURRENCY behind a sticky load balancer
+# or with websocket-only clients, and then:
+#   - FLASK_SOCKETIO_MESSAGE_QUEUE must point at Redis so emits from any worker
+#     reach every client and the roster caches stay in step (roster_sync.py)
+import os
+import subprocess
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8091')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', '1'))
+worker_class = 'gevent'
+worker_connections = 1000
+timeout = 60
+graceful_timeout = 30
+
+# Production logging: no per-packet Socket.IO logs, structured JSON records.
+# raw_env overwrites the environment, so keep any value that is already set.
+production_env = {
+    'FLASK_SOCKETIO_ASYNC_MODE': 'gevent',
+    'FLASK_LOG_LEVEL': os.environ.get('FLASK_LOG_LEVEL', 'INFO'),
+    'FLASK_LOG_LEVELS': os.environ.get(
+        'FLASK_LOG_LEVELS', '{"socketio.server": "WARNING", "engineio.server": "WARNING"}'),
+    'FLASK_LOG_FORMAT': os.environ.get('FLASK_LOG_FORMAT', 'json'),
+}
+raw_env = [f'{key}={value}' for key, value in production_env.items()]
+
+
+def on_starting(server):
+    # Create the tables once, in a separate process, before any worker imports
+    # the app (importing it here would leak un-monkeypatched state into the forks)
+    subprocess.run([sys.executable, '-c', 'from wsgi import init_db; init_db()'],
+                   cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+
+def post_fork(server, worker):
+    if workers > 1 and not os.environ.get('FLASK_SOCKETIO_MESSAGE_QUEUE'):
+        server.log.warning("Running %s workers without FLASK_SOCKETIO_MESSAGE_QUEUE: "
+                           "broadcasts and roster state will not be shared", workers)
@@ -0,0 +1,95 @@
+import bisect
+import threading
+from datetime import datetime
+
+WAITING_STATE = 'Đã checkin'
+CALLED_STATE = 'Gọi PV'
+CHECKIN_TIME_FORMAT = '%H:%M:%S %d/%m/%Y'  # as written by format_gmt7_time
+
+
+def _checkin_key(member):
+    """Sort key: check-in time, then id; members without a valid time go last"""
+    try:
+        checked_in = datetime.strptime(member.get('checkin_time') or '', CHECKIN_TIME_FORMAT)
+    except ValueError:
+        checked_in = datetime.max
+    return checked_in, member['id']
+
+
+class InterviewQueue:
+    """Checked-in members waiting for an interview, per specialist, oldest check-in first.
+
+    Kept in step with the roster as a RosterCache listener, so check-ins and
+    state changes from any endpoint (or worker) add and remove members. Each
+    specialist's queue is a list sorted by check-in time: check-ins arrive
+    in order and are appended, and reading or claiming the head only touches
+    that queue, never the whole roster.
+
+    claim() takes the head out of the queue until release() is called, so
+    interviewers calling at the same time get different candidates.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = {}   # specialist -> sorted [(check-in key, id)]
+        self._entries = {}  # id -> (specialist, check-in key)
+        self._claimed = set()
+
+    # RosterCache listener interface
+    def reset(self, members):
+        with self._lock:
+            self._queues, self._entries = {}, {}
+            for member in members:
+                self._add(member)
+
+    def update(self, member_id, member_data):
+        with self._lock:
+            self._remove(member_id)
+            if member_data is not None and member_id not in self._claimed:
+                self._add(member_data)
+
+    def _add(self, member):
+        if member.get('state') != WAITING_STATE or not member.get('specialist'):
+            return
+        key = _checkin_key(member)
+        queue = self._queues.setdefault(member['specialist'], [])
+        if not queue or queue[-1] < (key, member['id']):
+            queue.append((key, member['id']))
+        else:
+            bisect.insort(queue, (key, member['id']))
+        self._entries[member['id']] = (member['specialist'], key)
+
+    def _remove(self, member_id):
+        entry = self._entries.pop(member_id, None)
+        if entry is None:
+            return
+        specialist, key = entry
+        queue = self._queues[specialist]
+        position = bisect.bisect_left(queue, (key, member_id))
+        if position < len(queue) and queue[position] == (key, member_id):
+            del queue[position]
+
+    def peek(self, specialist, limit=20):
+        """(first `limit` member ids, queue length) for `specialist`"""
+        with self._lock:
+            queue = self._queues.get(specialist, ())
+            return [member_id for _, member_id in queue[:limit]], len(queue)
+
+    def claim(self, specialist):
+        """Take the longest-waiting member id out of the queue, None if it is empty"""
+        with self._lock:
+            queue = self._queues.get(specialist)
+            if not queue:
+                return None
+            _, member_id = queue[0]
+            self._remove(member_id)
+            self._claimed.add(member_id)
+            return member_id
+
+    def release(self, member_id, member_data):
+        """End a claim; the member goes back in the queue if `member_data` is still waiting"""
+        with self._lock:
+            self._claimed.discard(member_id)
+            self._remove(member_id)
+            if member_data is not None:
+                self._add(member_data)
@@ -0,0 +1,137 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Structured check-in/transition records go through this logger (see log_event)
+events_logger = logging.getLogger('events')
+
+_listener = None
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full.
+
+    The request thread only renders the message and puts the record on the
+    queue; timestamps, formatting and the write happen on the listener thread.
+    """
+
+    def __init__(self, max_size):
+        # SimpleQueue is implemented in C and much cheaper to put to than Queue
+        super().__init__(queue.SimpleQueue())
+        self.max_size = max_size
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Unlike the base class, don't format or copy the record: it never
+        # leaves the process and this handler is its only consumer
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+
+class SampledLogger(logging.LoggerAdapter):
+    """Logger wrapper keeping one in `every` records below WARNING.
+
+    Used for engine.io, which logs every packet sent to every client. Records
+    are dropped before they are created, so a skipped one costs a counter
+    increment; warnings and errors always pass.
+    """
+
+    def __init__(self, logger, every):
+        super().__init__(logger, {})
+        self.every = max(int(every), 1)
+        self._counter = itertools.count()
+
+    def log(self, level, msg, *args, **kwargs):
+        if not self.isEnabledFor(level):
+            return
+        if level < logging.WARNING and next(self._counter) % self.every:
+            return
+        self.logger.log(level, msg, *args, **kwargs)
+
+
+class StructuredFormatter(logging.Formatter):
+    """Text format, with the fields of log_event records appended as key=value"""
+
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            text += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log collectors"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def log_event(event, level=logging.INFO, **fields):
+    """Log a structured record, e.g. log_event('checkin', mssv=..., source='ESP').
+
+    Nothing is formatted on the calling thread, and nothing at all is done
+    when `level` is disabled.
+    """
+    if events_logger.isEnabledFor(level):
+        events_logger.log(level, event, extra={'fields': fields})
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def configure_logging(app):
+    """Route all logging through a queue drained by a background thread.
+
+    Reads LOG_LEVEL, LOG_LEVELS (per-logger overrides), LOG_FORMAT ('text' or
+    'json') and LOG_QUEUE_SIZE from the app config. Returns the queue handler;
+    its `dropped` counts records lost to a full queue.
+    """
+    global _listener
+    _stop_listener()
+
+    stream = logging.StreamHandler(sys.stderr)
+    formatter = JsonFormatter() if app.config['LOG_FORMAT'] == 'json' else StructuredFormatter(LOG_FORMAT)
+    stream.setFormatter(formatter)
+    handler = DroppingQueueHandler(app.config['LOG_QUEUE_SIZE'])
+    _listener = logging.handlers.QueueListener(handler.queue, stream, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(app.config['LOG_LEVEL'])
+    for name, level in app.config['LOG_LEVELS'].items():
+        logging.getLogger(name).setLevel(level)
+    return handler
+
+
+# Flush what is still queued on exit
+atexit.register(_stop_listener)
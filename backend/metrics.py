@@ -0,0 +1,225 @@
+import bisect
+import math
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Exposition format served by /api/metrics
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+_registry = []
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """Monotonic counter; `value` may be a callable read at scrape time"""
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=(), value=None):
+        super().__init__(name, documentation, labelnames)
+        # Unlabelled series are reported from the start, as 0
+        self._values = {} if self.labelnames else {(): 0}
+        self._callback = value
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def _samples(self):
+        if self._callback is not None:
+            return [f'{self.name} {_format_value(self._callback())}']
+        return [f'{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}'
+                for labels, value in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (math.inf,)
+        self._series = {}  # labels -> [per-bucket counts, sum]
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *labels):
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    def _samples(self):
+        lines = []
+        for labels, (counts, total) in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}')
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{label_text} {_format_value(total)}')
+            lines.append(f'{self.name}_count{label_text} {cumulative}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+def render():
+    """All metrics in the Prometheus text format"""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+# Metrics are per process: under gunicorn each worker reports its own
+REQUEST_SECONDS = Histogram('http_request_duration_seconds', 'HTTP request latency by route',
+                            ('route', 'method', 'status'))
+REQUEST_DB_QUERIES = Histogram('http_request_db_queries', 'Database queries run on the request thread per request',
+                               ('route',), buckets=COUNT_BUCKETS)
+REQUEST_DB_SECONDS = Histogram('http_request_db_seconds', 'Database time on the request thread per request',
+                               ('route',))
+DB_QUERY_SECONDS = Histogram('db_query_duration_seconds', 'Duration of every database statement, '
+                             'including those run by the group-commit worker')
+SQLITE_LOCK_WAIT_SECONDS = Histogram('sqlite_write_lock_wait_seconds',
+                                     'Duration of the first write statement of each transaction, '
+                                     'where SQLite waits (busy_timeout) for the write lock')
+SQLITE_BUSY = Counter('sqlite_busy_errors_total', 'Statements that failed with "database is locked"')
+WRITE_BATCH_SIZE = Histogram('write_batch_size', 'Writes per group commit', buckets=COUNT_BUCKETS[1:])
+SOCKETIO_CLIENTS = Gauge('socketio_connected_clients', 'Connected Socket.IO clients')
+BROADCAST_SECONDS = Histogram('socketio_broadcast_duration_seconds',
+                              'Time to hand a broadcast to every recipient (or the message queue)', ('event',))
+STATE_TRANSITIONS = Counter('member_state_transitions_total', 'Members moved into each state', ('state',))
+# States counted by name; anything else a client sends is counted as 'other'
+TRANSITION_STATES = ('Đã checkin', 'Gọi PV', 'Đang phỏng vấn', 'Đã phỏng vấn')
+
+_request = threading.local()
+
+
+def start_request():
+    """Start counting database work on this thread for the current request"""
+    _request.queries = 0
+    _request.db_seconds = 0.0
+
+
+def take_db_usage():
+    """(queries, seconds) counted on this thread since the last call; restarts the count"""
+    usage = (getattr(_request, 'queries', None) or 0, getattr(_request, 'db_seconds', 0.0))
+    start_request()
+    return usage
+
+
+def add_db_usage(usage):
+    """Count database work done for this request on another thread (the group-commit worker)"""
+    if getattr(_request, 'queries', None) is not None:
+        _request.queries += usage[0]
+        _request.db_seconds += usage[1]
+
+
+def finish_request(route, method, status, seconds):
+    REQUEST_SECONDS.observe(seconds, route, method, status)
+    REQUEST_DB_QUERIES.observe(getattr(_request, 'queries', 0), route)
+    REQUEST_DB_SECONDS.observe(getattr(_request, 'db_seconds', 0.0), route)
+    _request.queries = None
+
+
+def count_transition(state):
+    STATE_TRANSITIONS.inc(state if state in TRANSITION_STATES else 'other')
+
+
+_WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['query_started'] = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info.pop('query_started', time.perf_counter())
+    DB_QUERY_SECONDS.observe(seconds)
+    if getattr(_request, 'queries', None) is not None:
+        _request.queries += 1
+        _request.db_seconds += seconds
+    if not conn.info.get('in_write') and statement.lstrip()[:7].upper().startswith(_WRITE_PREFIXES):
+        conn.info['in_write'] = True
+        SQLITE_LOCK_WAIT_SECONDS.observe(seconds)
+
+
+@event.listens_for(Engine, 'commit')
+@event.listens_for(Engine, 'rollback')
+def _end_transaction(conn):
+    conn.info.pop('in_write', None)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _count_busy(context):
+    if 'database is locked' in str(context.original_exception):
+        SQLITE_BUSY.inc()
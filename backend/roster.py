@@ -0,0 +1,257 @@
+import gzip
+import threading
+import time
+from collections import deque
+
+from serializer import COLUMNS_FORMAT, OBJECTS_FORMAT, encode, encode_members, join_members, member_row_json
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip is always available
+    brotli = None
+
+# Content-Encodings the cached snapshot can be served in, best first
+SNAPSHOT_ENCODINGS = (('br', 'gzip') if brotli is not None else ('gzip',))
+
+
+class RosterCache:
+    """In-memory copy of the Member table.
+
+    Reads (GET /api/members, socket snapshots) are served from here and never
+    touch the database. Write paths call upsert()/remove() after their commit
+    succeeds so the cache always mirrors the committed state. On startup (or
+    after invalidate()) the cache is rebuilt from the database through
+    `loader`, which must be called inside an app context.
+
+    Every change bumps a monotonically increasing roster version and is kept
+    in a bounded change log so clients can catch up with changes_since()
+    instead of downloading the whole roster again. The version is rebased on
+    the wall clock (in ms) whenever the cache is (re)loaded, so versions from
+    a previous process are always older than the new log and force a full
+    snapshot.
+
+    Each member is JSON-encoded once per change (in both socket formats) and
+    snapshots are joined from those pieces, so a change re-encodes one
+    member rather than the whole roster.
+
+    Derived in-memory indexes register with add_listener(); they are reset on
+    every (re)load and told about every change, local or remote, in order.
+
+    When several worker processes serve the app, attach a RosterSync: versions
+    then come from a shared counter and every local change is published so
+    the other workers' caches apply it too (see roster_sync.py).
+    """
+
+    def __init__(self, loader, log_size=1000):
+        self._loader = loader
+        self._lock = threading.RLock()
+        self._members = {}
+        self._list = None
+        self._json = None
+        self._encoded = {}
+        self._lists = {}
+        self._pieces = {}  # (format, member id) -> that member's JSON
+        self._loaded = False
+        self._version = 0
+        self._log = deque(maxlen=log_size)
+        # All changes with version > _log_floor are present in _log
+        self._log_floor = 0
+        self._sync = None
+        self._listeners = []
+
+    def add_listener(self, listener):
+        """Register an object with reset(members) and update(member_id, member_data)"""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._loaded:
+                listener.reset(list(self._members.values()))
+
+    def attach_sync(self, sync):
+        """Share versions and changes with other processes through `sync`"""
+        with self._lock:
+            self._sync = sync
+            self._loaded = False
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self._members = {m['id']: m for m in self._loader()}
+            self._list = None
+            self._json = None
+            self._encoded = {}
+            self._lists = {}
+            self._pieces = {}
+            if self._sync is not None:
+                self._version = self._sync.current_version()
+            else:
+                self._version = max(self._version + 1, int(time.time() * 1000))
+            self._log.clear()
+            self._log_floor = self._version
+            self._loaded = True
+            for listener in self._listeners:
+                listener.reset(list(self._members.values()))
+
+    def ensure_loaded(self):
+        with self._lock:
+            self._ensure_loaded()
+
+    def _record(self, member_id, member_data, version=None):
+        if version is None:
+            version = self._sync.next_version() if self._sync is not None else self._version + 1
+            if self._sync is not None:
+                self._sync.publish(member_id, member_data, version)
+        self._version = max(self._version, version)
+        if len(self._log) == self._log.maxlen:
+            self._log_floor = self._log[0][0]
+        self._log.append((version, member_id, member_data))
+        self._list = None
+        self._json = None
+        self._encoded = {}
+        self._lists = {}
+        self._pieces.pop((OBJECTS_FORMAT, member_id), None)
+        self._pieces.pop((COLUMNS_FORMAT, member_id), None)
+        for listener in self._listeners:
+            listener.update(member_id, member_data)
+        return version
+
+    @property
+    def version(self):
+        with self._lock:
+            self._ensure_loaded()
+            return self._version
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+            self._members = {}
+            self._list = None
+            self._json = None
+            self._encoded = {}
+            self._lists = {}
+            self._pieces = {}
+
+    def members(self):
+        """Return the cached list of member dicts (do not mutate)"""
+        with self._lock:
+            self._ensure_loaded()
+            if self._list is None:
+                self._list = sorted(self._members.values(), key=lambda m: m['id'])
+            return self._list
+
+    def snapshot_json(self):
+        """Return the roster pre-serialized as a JSON string"""
+        with self._lock:
+            if self._json is None:
+                self._json = self.members_json()
+            return self._json
+
+    def members_json(self, fmt=OBJECTS_FORMAT):
+        """The whole roster as socket-ready RawJSON in `fmt`, encoded once per version"""
+        with self._lock:
+            members = self.members()
+            encoded = self._lists.get(fmt)
+            if encoded is None:
+                encoded = self._lists[fmt] = join_members([self._piece(fmt, m) for m in members], fmt)
+            return encoded
+
+    def encode_members(self, members, fmt=OBJECTS_FORMAT):
+        """Encode a list of member dicts, reusing the cached JSON of roster members.
+
+        Dicts that are not the roster's current ones (projections, stale
+        copies) are encoded afresh.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if members is self._list:
+                return self.members_json(fmt)
+            if any(self._members.get(m.get('id')) is not m for m in members):
+                return encode_members(members, fmt)
+            return join_members([self._piece(fmt, m) for m in members], fmt)
+
+    def _piece(self, fmt, member):
+        key = (fmt, member['id'])
+        encoded = self._pieces.get(key)
+        if encoded is None:
+            encoded = self._pieces[key] = member_row_json(member) if fmt == COLUMNS_FORMAT else encode(member)
+        return encoded
+
+    def snapshot(self, encoding=None):
+        """Return (version, body) for the roster JSON in the given Content-Encoding.
+
+        Each encoding is compressed at most once per roster version.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            body = self._encoded.get(encoding)
+            if body is None:
+                body = self.snapshot_json().encode('utf-8')
+                if encoding == 'gzip':
+                    body = gzip.compress(body, compresslevel=6, mtime=0)
+                elif encoding == 'br':
+                    body = brotli.compress(body)
+                self._encoded[encoding] = body
+            return self._version, body
+
+    def get(self, member_id):
+        with self._lock:
+            self._ensure_loaded()
+            return self._members.get(member_id)
+
+    def upsert(self, member_data):
+        """Store a committed member and return the new roster version"""
+        with self._lock:
+            self._ensure_loaded()
+            member_data = dict(member_data)
+            self._members[member_data['id']] = member_data
+            return self._record(member_data['id'], member_data)
+
+    def remove(self, member_id):
+        """Drop a committed deletion and return the new roster version"""
+        with self._lock:
+            self._ensure_loaded()
+            self._members.pop(member_id, None)
+            return self._record(member_id, None)
+
+    def apply_remote(self, member_id, member_data, version):
+        """Apply a change committed by another worker (member_data None = deleted)"""
+        with self._lock:
+            if not self._loaded:
+                # The next load reads it from the database anyway
+                return
+            if member_data is None:
+                self._members.pop(member_id, None)
+            else:
+                self._members[member_id] = member_data
+            self._record(member_id, member_data, version)
+
+    def changes_since(self, since_version):
+        """Return (version, changes) for everything after `since_version`.
+
+        Changes are coalesced per member id: an upsert carries the latest
+        member dict, a deletion is a tombstone. `changes` is None when the
+        client is too far behind the retained log (or from another process)
+        and needs a full snapshot instead.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            if since_version is None or since_version < self._log_floor or since_version > self._version:
+                return self._version, None
+            latest = {}
+            for version, member_id, member_data in self._log:
+                if version > since_version:
+                    latest.pop(member_id, None)
+                    latest[member_id] = (version, member_data)
+            changes = []
+            for member_id, (version, member_data) in latest.items():
+                if member_data is None:
+                    changes.append({'type': 'delete', 'id': member_id, 'version': version})
+                else:
+                    changes.append({'type': 'upsert', 'member': member_data, 'version': version})
+            return self._version, changes
+
+    def sync_payload(self, since_version=None):
+        """Build the reply for a sync request: a delta or a full snapshot"""
+        with self._lock:
+            version, changes = self.changes_since(since_version)
+            if changes is None:
+                return {'version': version, 'full': True, 'members': self.members()}
+            return {'version': version, 'full': False, 'changes': changes}
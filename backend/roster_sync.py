@@ -0,0 +1,56 @@
+import json
+import logging
+import time
+import uuid
+
+VERSION_KEY = 'roster:version'
+CHANNEL = 'roster:changes'
+
+
+class RosterSync:
+    """Keep the RosterCache of every worker process in step through Redis.
+
+    Versions come from one shared counter (INCR), so a version means the same
+    thing whichever worker a client talks to, and each committed change is
+    published on a channel that the other workers apply to their own cache.
+    Socket.IO emits already reach every client through the SocketIO
+    message_queue; this only covers the server-side state.
+
+    `client` is a redis.Redis instance (fakeredis works for local testing).
+    """
+
+    def __init__(self, client, roster):
+        self.client = client
+        self.roster = roster
+        self.origin = uuid.uuid4().hex
+        # Seed the counter on the wall clock like a single-process cache does
+        self.client.set(VERSION_KEY, int(time.time() * 1000), nx=True)
+
+    def current_version(self):
+        return int(self.client.get(VERSION_KEY))
+
+    def next_version(self):
+        return int(self.client.incr(VERSION_KEY))
+
+    def publish(self, member_id, member_data, version):
+        self.client.publish(CHANNEL, json.dumps({
+            'origin': self.origin,
+            'id': member_id,
+            'member': member_data,
+            'version': version
+        }, ensure_ascii=False))
+
+    def start(self, socketio):
+        """Subscribe before the roster is loaded so no change slips in between"""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(CHANNEL)
+        socketio.start_background_task(self._listen, pubsub)
+
+    def _listen(self, pubsub):
+        for message in pubsub.listen():
+            try:
+                change = json.loads(message['data'])
+                if change['origin'] != self.origin:
+                    self.roster.apply_remote(change['id'], change['member'], change['version'])
+            except Exception as e:
+                logging.error("Error applying roster change from another worker: %s", e)
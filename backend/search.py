@@ -0,0 +1,197 @@
+import bisect
+import re
+import threading
+import unicodedata
+
+_TOKEN_RE = re.compile(r'[0-9a-z]+')
+# Longest indexed prefix of a single token / of the whole name or MSSV;
+# longer query terms are verified against the (already small) candidate set
+MAX_PREFIX = 16
+MAX_PHRASE = 40
+
+_EMPTY = frozenset()
+# (phrase prefix, all whole words, given name) combinations, best first
+_TIERS = ((1, 1, 1), (1, 1, 0), (1, 0, 1), (1, 0, 0), (0, 1, 1), (0, 1, 0), (0, 0, 1), (0, 0, 0))
+
+
+def normalize(text):
+    """Lowercase and strip Vietnamese diacritics: 'Nguyễn Phúc' -> 'nguyen phuc'"""
+    if not text:
+        return ''
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def _prefixes(text, limit):
+    return (text[:end] for end in range(1, min(len(text), limit) + 1))
+
+
+def _index(mapping, key, member_id):
+    mapping.setdefault(key, set()).add(member_id)
+
+
+def _unindex(mapping, key, member_id):
+    ids = mapping.get(key)
+    if ids is not None:
+        ids.discard(member_id)
+        if not ids:
+            del mapping[key]
+
+
+class MemberSearchIndex:
+    """Prefix index over the normalized name, MSSV and email of every member.
+
+    Kept in step with the roster as a RosterCache listener, so adds, edits and
+    deletes (including ones made by other workers) update it incrementally.
+
+    Every query token must prefix-match a token of the member. Matches are
+    ranked by, in order of weight: the whole query is a prefix of the name or
+    MSSV, every query token is a whole word, the last query token starts the
+    given name (last word of a Vietnamese name); ties are ordered by name.
+    Ranking is done with set operations over posting sets, so broad queries
+    like '2023' stay cheap on large rosters.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset_state()
+
+    def _reset_state(self):
+        self._prefixes = {}         # token prefix -> ids
+        self._exact = {}            # whole token -> ids
+        self._name_prefixes = {}    # prefix of the full normalized name -> ids
+        self._mssv_prefixes = {}    # prefix of the MSSV -> ids
+        self._given_prefixes = {}   # prefix of the given name -> ids
+        self._entries = {}          # id -> (tokens, name, MSSV, given name)
+        self._by_name = []          # sorted (name, id)
+
+    # RosterCache listener interface
+    def reset(self, members):
+        with self._lock:
+            self._reset_state()
+            for member in members:
+                self._add(member)
+
+    def update(self, member_id, member_data):
+        with self._lock:
+            self._remove(member_id)
+            if member_data is not None:
+                self._add(member_data)
+
+    def _keys(self, entry):
+        tokens, name, mssv, given = entry
+        for token in tokens:
+            yield self._exact, token
+            for prefix in _prefixes(token, MAX_PREFIX):
+                yield self._prefixes, prefix
+        for prefix in _prefixes(name, MAX_PHRASE):
+            yield self._name_prefixes, prefix
+        for prefix in _prefixes(mssv, MAX_PHRASE):
+            yield self._mssv_prefixes, prefix
+        for prefix in _prefixes(given, MAX_PREFIX):
+            yield self._given_prefixes, prefix
+
+    def _add(self, member):
+        name_tokens = tokenize(member.get('name'))
+        mssv = normalize(member.get('MSSV'))
+        email = (member.get('email') or '').split('@')[0]
+        tokens = frozenset(name_tokens) | frozenset(tokenize(mssv)) | frozenset(tokenize(email))
+        name = ' '.join(name_tokens)
+        entry = (tokens, name, mssv, name_tokens[-1] if name_tokens else '')
+        self._entries[member['id']] = entry
+        for mapping, key in self._keys(entry):
+            _index(mapping, key, member['id'])
+        bisect.insort(self._by_name, (name, member['id']))
+
+    def _remove(self, member_id):
+        entry = self._entries.pop(member_id, None)
+        if entry is None:
+            return
+        for mapping, key in self._keys(entry):
+            _unindex(mapping, key, member_id)
+        position = bisect.bisect_left(self._by_name, (entry[1], member_id))
+        if position < len(self._by_name) and self._by_name[position] == (entry[1], member_id):
+            del self._by_name[position]
+
+    def search(self, query, limit=10):
+        """Return up to `limit` member ids, best match first"""
+        terms = tokenize(query)
+        if not terms or limit < 1:
+            return []
+        with self._lock:
+            postings = []
+            for term in terms:
+                ids = self._prefixes.get(term[:MAX_PREFIX])
+                if not ids:
+                    return []
+                postings.append(ids)
+            postings.sort(key=len)
+            candidates = postings[0] if len(postings) == 1 else postings[0].intersection(*postings[1:])
+            long_terms = [term for term in terms if len(term) > MAX_PREFIX]
+            if long_terms:
+                candidates = {member_id for member_id in candidates
+                              if all(any(token.startswith(term) for token in self._entries[member_id][0])
+                                     for term in long_terms)}
+            if not candidates:
+                return []
+
+            # Ranking sets are looked up, not intersected with the candidates
+            # up front, so a broad query doesn't copy thousands of ids
+            phrase = ' '.join(terms)
+            name_ids = self._name_prefixes.get(phrase[:MAX_PHRASE], _EMPTY)
+            mssv_ids = self._mssv_prefixes.get(phrase[:MAX_PHRASE], _EMPTY)
+            phrase_ids = name_ids | mssv_ids if name_ids and mssv_ids else name_ids or mssv_ids
+            if len(phrase) > MAX_PHRASE:
+                phrase_ids = {member_id for member_id in phrase_ids & candidates
+                              if self._entries[member_id][1].startswith(phrase)
+                              or self._entries[member_id][2].startswith(phrase)}
+            # Names sharing a prefix are contiguous in name order
+            name_start = phrase if phrase_ids is name_ids else None
+            exact_sets = sorted((self._exact.get(term, _EMPTY) for term in terms), key=len)
+            exact_ids = exact_sets[0].intersection(*exact_sets[1:]) if exact_sets[0] else _EMPTY
+            given_ids = self._given_prefixes.get(terms[-1][:MAX_PREFIX], _EMPTY)
+
+            results = []
+            # Tiers by weight: phrase prefix (4) > all whole words (2) > given name (1)
+            for bits in _TIERS:
+                features = tuple(zip(bits, (phrase_ids, exact_ids, given_ids)))
+                wanted = sorted((ids for bit, ids in features if bit), key=len)
+                if any(not ids for ids in wanted):
+                    continue
+                unwanted = [ids for bit, ids in features if not bit and ids]
+                if wanted:
+                    tier = wanted[0].intersection(candidates, *wanted[1:])
+                else:
+                    tier = set(candidates)
+                tier.difference_update(*unwanted)
+                if not tier:
+                    continue
+                start = name_start if bits[0] else None
+                results.extend(self._first_by_name(tier, limit - len(results), start))
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _first_by_name(self, tier, count, start=None):
+        """First `count` ids of `tier` in name order, all named `start...` if given"""
+        if len(tier) <= count * 8:
+            ranked = sorted((self._entries[i][1], i) for i in tier)
+            return [member_id for _, member_id in ranked[:count]]
+        # Large tier: walk the name-ordered list until enough members are found
+        found = []
+        by_name = self._by_name
+        position = bisect.bisect_left(by_name, (start,)) if start else 0
+        for position in range(position, len(by_name)):
+            name, member_id = by_name[position]
+            if start and not name.startswith(start):
+                break
+            if member_id in tier:
+                found.append(member_id)
+                if len(found) == count:
+                    break
+        return found
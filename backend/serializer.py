@@ -0,0 +1,73 @@
+import json
+
+# Public member fields, in the order of the columns format
+MEMBER_FIELDS = ('id', 'MSSV', 'name', 'email', 'specialist', 'linkCV', 'checkin_time', 'state', 'called_time', 'note')
+
+# How member lists are sent on the socket, chosen with {'format': ...} in the
+# connect auth: a list of objects, or {"fields": [...], "rows": [[...], ...]}
+OBJECTS_FORMAT = 'objects'
+COLUMNS_FORMAT = 'columns'
+FORMATS = (OBJECTS_FORMAT, COLUMNS_FORMAT)
+
+
+def serialize_member(member):
+    """Build the public dict for a Member row"""
+    return {field: getattr(member, field) for field in MEMBER_FIELDS}
+
+
+def encode(value):
+    """Compact JSON; Vietnamese names stay UTF-8 instead of \\u escapes"""
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+def member_row_json(member):
+    return encode([member.get(field) for field in MEMBER_FIELDS])
+
+
+def join_members(encoded, fmt=OBJECTS_FORMAT):
+    """A member list from already-encoded members (encode / member_row_json)"""
+    if fmt == COLUMNS_FORMAT:
+        return RawJSON(f'{{"fields":{encode(MEMBER_FIELDS)},"rows":[{",".join(encoded)}]}}')
+    return RawJSON(f'[{",".join(encoded)}]')
+
+
+def encode_members(members, fmt=OBJECTS_FORMAT):
+    """Encode member dicts (any subset of MEMBER_FIELDS) as a list of objects or in columns"""
+    if fmt != COLUMNS_FORMAT:
+        return RawJSON(encode(members))
+    fields = [field for field in MEMBER_FIELDS if not members or field in members[0]]
+    return RawJSON(encode({'fields': fields, 'rows': [[member.get(field) for field in fields] for member in members]}))
+
+
+class RawJSON(str):
+    """JSON text that SocketIOJSON embeds in an event as is, without encoding it again"""
+    __slots__ = ()
+
+
+def _encode_argument(value):
+    if isinstance(value, RawJSON):
+        return value
+    if isinstance(value, dict) and any(isinstance(item, RawJSON) for item in value.values()):
+        return '{' + ','.join(f'{encode(str(key))}:{_encode_argument(item)}' for key, item in value.items()) + '}'
+    return encode(value)
+
+
+class SocketIOJSON:
+    """json module for SocketIO(json=...).
+
+    Packets are encoded with ensure_ascii off, and a RawJSON event argument
+    (or a RawJSON value of a dict argument) is spliced in verbatim, so a
+    cached roster snapshot is not re-encoded for every client.
+    """
+
+    @staticmethod
+    def dumps(value, **kwargs):
+        if isinstance(value, list) and any(
+                isinstance(item, RawJSON) or
+                (isinstance(item, dict) and any(isinstance(v, RawJSON) for v in item.values()))
+                for item in value):
+            return '[' + ','.join(_encode_argument(item) for item in value) + ']'
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(value, **kwargs)
+
+    loads = staticmethod(json.loads)
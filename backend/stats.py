@@ -0,0 +1,188 @@
+import heapq
+import threading
+from collections import Counter
+from datetime import datetime
+
+from interview_queue import CHECKIN_TIME_FORMAT
+
+# Reached once a candidate has been called out of the waiting line
+INTERVIEW_STATES = ('Gọi PV', 'Đang phỏng vấn', 'Đã phỏng vấn')
+INTERVIEWED_STATE = 'Đã phỏng vấn'
+NO_SPECIALIST = ''
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value or '', CHECKIN_TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+class _CallTimes:
+    """Multiset of call times whose earliest is found without scanning the members.
+
+    A heap of the distinct times, with a count each; a time whose count drops
+    to zero stays in the heap until it reaches the top, so removing and
+    re-adding the same member (every update() does) costs O(1).
+    """
+    __slots__ = ('_heap', '_counts')
+
+    def __init__(self):
+        self._heap = []
+        self._counts = Counter()  # every time in the heap, live or not
+
+    def add(self, called):
+        if called not in self._counts:
+            heapq.heappush(self._heap, called)
+        self._counts[called] += 1
+
+    def remove(self, called):
+        self._counts[called] -= 1
+
+    def first(self):
+        while self._heap and not self._counts[self._heap[0]]:
+            del self._counts[heapq.heappop(self._heap)]
+        return self._heap[0] if self._heap else None
+
+
+class _Totals:
+    """Counters for one group of members (everyone, or one specialist)"""
+    __slots__ = ('count', 'states', 'wait_seconds', 'waits', 'calls')
+
+    def __init__(self):
+        self.count = 0
+        self.states = Counter()
+        self.wait_seconds = 0.0
+        self.waits = 0
+        self.calls = _CallTimes()
+
+
+class RosterStats:
+    """Member counts per state and specialist, kept in step with the roster.
+
+    A RosterCache listener: reset() rebuilds every counter from the roster
+    (so from the database on startup) and update() only adjusts the groups
+    of the member that changed, by removing its previous contribution and
+    adding the new one. snapshot() reads the counters and never walks the
+    roster.
+
+    The wait of a member is the time from checkin_time to called_time, the
+    moment it was first called out of the waiting line. Throughput is the
+    number of finished interviews per hour since a specialist's first call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._members = {}  # id -> (specialist, state, wait seconds or None, called_time or None)
+        self._groups = {}   # specialist -> _Totals; None is everyone
+
+    # RosterCache listener interface
+    def reset(self, members):
+        with self._lock:
+            self._members, self._groups = {}, {None: _Totals()}
+            for member in members:
+                self._add(member['id'], member)
+
+    def update(self, member_id, member_data):
+        with self._lock:
+            self._remove(member_id)
+            if member_data is not None:
+                self._add(member_id, member_data)
+
+    def _add(self, member_id, member):
+        called = _parse_time(member.get('called_time')) if member.get('state') in INTERVIEW_STATES else None
+        checked_in = _parse_time(member.get('checkin_time'))
+        wait = (called - checked_in).total_seconds() if called and checked_in else None
+        entry = (member.get('specialist') or NO_SPECIALIST, member.get('state') or '', wait, called)
+        self._members[member_id] = entry
+        for key in (None, entry[0]):
+            totals = self._groups.get(key)
+            if totals is None:
+                totals = self._groups[key] = _Totals()
+            totals.count += 1
+            totals.states[entry[1]] += 1
+            if wait is not None:
+                totals.wait_seconds += wait
+                totals.waits += 1
+            if called is not None:
+                totals.calls.add(called)
+
+    def _remove(self, member_id):
+        entry = self._members.pop(member_id, None)
+        if entry is None:
+            return
+        specialist, state, wait, called = entry
+        for key in (None, specialist):
+            totals = self._groups[key]
+            totals.count -= 1
+            totals.states[state] -= 1
+            if not totals.states[state]:
+                del totals.states[state]
+            if wait is not None:
+                totals.wait_seconds -= wait
+                totals.waits -= 1
+            if called is not None:
+                totals.calls.remove(called)
+            if key is not None and not totals.count:
+                del self._groups[key]
+
+    def snapshot(self, now=None):
+        """Counts, average wait and throughput, overall and per specialist.
+
+        `now` (naive, GMT+7 like checkin_time) is the end of the throughput
+        window; without it only the interviewed counts are reported.
+        """
+        with self._lock:
+            groups = dict(self._groups)
+            overall = groups.pop(None, None) or _Totals()
+            return {
+                **self._summary(overall, now),
+                'specialists': {specialist: self._summary(groups[specialist], now) for specialist in sorted(groups)},
+            }
+
+    @staticmethod
+    def _summary(totals, now):
+        interviewed = totals.states.get(INTERVIEWED_STATE, 0)
+        per_hour = None
+        first_called = totals.calls.first()
+        if now is not None and first_called is not None and interviewed:
+            hours = (now - first_called).total_seconds() / 3600
+            per_hour = round(interviewed / hours, 2) if hours > 0 else None
+        return {
+            'total': totals.count,
+            'states': dict(totals.states),
+            'avg_wait_seconds': round(totals.wait_seconds / totals.waits, 1) if totals.waits else None,
+            'interviewed': interviewed,
+            'interviews_per_hour': per_hour,
+        }
+
+
+class StatsBroadcaster:
+    """Emit stats_updated at most once per window after member changes.
+
+    Call changed() after each local change; a burst of check-ins produces a
+    single event with the counters as they are at the end of the window.
+    """
+
+    def __init__(self, socketio, snapshot, window_ms=500):
+        self.socketio = socketio
+        self.snapshot = snapshot
+        self.window = window_ms / 1000.0
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def changed(self):
+        if self.window <= 0:
+            self.socketio.emit('stats_updated', self.snapshot())
+            return
+        with self._lock:
+            if self._scheduled:
+                return
+            self._scheduled = True
+        self.socketio.start_background_task(self._emit_later)
+
+    def _emit_later(self):
+        self.socketio.sleep(self.window)
+        with self._lock:
+            self._scheduled = False
+        self.socketio.emit('stats_updated', self.snapshot())
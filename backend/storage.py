@@ -0,0 +1,135 @@
+import logging
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine, make_url
+
+# Applied to every new SQLite connection. WAL lets the roster reads run while
+# a check-in is being written; synchronous=NORMAL is durable in WAL mode
+# except for the last transactions on power loss.
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', 5000),    # ms to wait on the write lock instead of failing
+    ('cache_size', -20000),    # 20 MB page cache per connection
+    ('mmap_size', 268435456),  # 256 MB memory-mapped reads
+    ('temp_store', 'MEMORY'),
+)
+
+def _add_column(table, column, ddl):
+    """Migration step adding a column unless the table already has it"""
+    def step(conn):
+        columns = {row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')}
+        if column not in columns:
+            conn.exec_driver_sql(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}')
+    return step
+
+
+# Schema migrations, applied in order and tracked in PRAGMA user_version.
+# A step is an SQL string or a callable taking the connection. Version 1 is
+# the schema db.create_all()/import.py used to create, so it is a no-op on
+# existing databases.
+MIGRATIONS = (
+    (1, 'baseline schema', (
+        '''CREATE TABLE IF NOT EXISTS Member (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            MSSV VARCHAR(20) NOT NULL UNIQUE,
+            email VARCHAR(100),
+            specialist VARCHAR(100),
+            linkCV VARCHAR(500),
+            checkin_time VARCHAR(100),
+            state VARCHAR(100),
+            note VARCHAR(500)
+        )''',
+        '''CREATE TABLE IF NOT EXISTS user (
+            id INTEGER NOT NULL PRIMARY KEY,
+            username VARCHAR(80) NOT NULL UNIQUE,
+            password VARCHAR(200) NOT NULL,
+            MSSV VARCHAR(20) NOT NULL REFERENCES Member (MSSV)
+        )''',
+    )),
+    (2, 'index member state, specialist and MSSV', (
+        'CREATE INDEX IF NOT EXISTS ix_member_state ON Member (state)',
+        'CREATE INDEX IF NOT EXISTS ix_member_specialist ON Member (specialist)',
+        'CREATE INDEX IF NOT EXISTS ix_member_MSSV ON Member (MSSV)',
+    )),
+    (3, 'index member name and specialist+state for the paginated roster query', (
+        'CREATE INDEX IF NOT EXISTS ix_member_name ON Member (name)',
+        'CREATE INDEX IF NOT EXISTS ix_member_specialist_state ON Member (specialist, state)',
+    )),
+    (4, 'sign-up sheet Timestamp for incremental sync', (
+        _add_column('Member', 'source_timestamp', 'VARCHAR(100)'),
+    )),
+    (5, 'time a candidate was called, for wait statistics', (
+        _add_column('Member', 'called_time', 'VARCHAR(100)'),
+    )),
+    (6, 'append-only state transition log with epoch timestamps', (
+        '''CREATE TABLE IF NOT EXISTS transition (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            member_id INTEGER NOT NULL,
+            specialist VARCHAR(100),
+            from_state VARCHAR(100),
+            to_state VARCHAR(100) NOT NULL,
+            at INTEGER NOT NULL,
+            source VARCHAR(20)
+        )''',
+        # Time-range scans per state; covers the analytics queries
+        'CREATE INDEX IF NOT EXISTS ix_transition_state_at ON transition (to_state, at, specialist, member_id)',
+        # A member's latest check-in before a call
+        'CREATE INDEX IF NOT EXISTS ix_transition_member ON transition (member_id, to_state, at)',
+    )),
+)
+
+
+def configure_database(app):
+    """Set the database URI and engine options on `app` before SQLAlchemy(app).
+
+    DATABASE_URL (as set in docker-compose.yml) overrides the configured URI.
+    A relative sqlite path in DATABASE_URL is taken relative to the working
+    directory, like any SQLAlchemy URL, rather than Flask's instance folder.
+    """
+    database_url = os.environ.get('DATABASE_URL')
+    if database_url:
+        url = make_url(database_url)
+        if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+                and not os.path.isabs(url.database):
+            url = url.set(database=os.path.abspath(url.database))
+        app.config['SQLALCHEMY_DATABASE_URI'] = url.render_as_string(hide_password=False)
+
+    options = {
+        'pool_size': app.config.get('DB_POOL_SIZE', 10),
+        'max_overflow': app.config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': app.config.get('DB_POOL_TIMEOUT', 30),
+    }
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        options['connect_args'] = {'check_same_thread': False}
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+@event.listens_for(Engine, 'connect')
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f'PRAGMA {name} = {value}')
+    cursor.close()
+
+
+def migrate(engine):
+    """Bring the database schema up to the latest migration"""
+    with engine.begin() as conn:
+        current = conn.exec_driver_sql('PRAGMA user_version').scalar()
+        for version, description, statements in MIGRATIONS:
+            if version <= current:
+                continue
+            logging.info("Applying migration %s: %s", version, description)
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.exec_driver_sql(statement)
+            conn.exec_driver_sql(f'PRAGMA user_version = {version}')
+    return max(current, MIGRATIONS[-1][0])
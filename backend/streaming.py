@@ -0,0 +1,28 @@
+class StreamBuffer:
+    """Write-only, unseekable file for writers (zipfile, csv) feeding a generator response.
+
+    The generator calls drain() after each piece it writes and yields the
+    bytes, so nothing accumulates beyond one piece. zipfile sees no seek()
+    and writes sizes in data descriptors after each entry.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data, self.chunks = b''.join(self.chunks), []
+        return data
@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+# The backend modules are imported as top-level modules, as wsgi.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    """The app on a throwaway database and cache directories (imported once per run)"""
+    directory = tmp_path_factory.mktemp('instance')
+    os.environ.update({
+        'FLASK_SQLALCHEMY_DATABASE_URI': f"sqlite:///{directory / 'members.db'}",
+        'FLASK_CV_CACHE_DIR': str(directory / 'cv_cache'),
+        'FLASK_BADGE_DIR': str(directory / 'badges'),
+        'FLASK_CV_PREFETCH_WORKERS': '0',
+        'FLASK_LOG_LEVEL': 'WARNING',
+    })
+    from wsgi import app, init_db
+    init_db()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def add_member(client):
+    """Add a member through the API and return its dict"""
+    def add(mssv, specialist='Tech', **fields):
+        response = client.post('/api/members', json={'name': f'Ứng viên {mssv}', 'MSSV': mssv,
+                                                     'specialist': specialist, **fields})
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()['member']
+    return add
+
+
+@pytest.fixture
+def transitions(app):
+    """(from_state, to_state, at, source) logged for a member id, oldest first"""
+    def logged(member_id):
+        from app import Transition, db
+        with app.app_context():
+            return [(t.from_state, t.to_state, t.at, t.source) for t in
+                    db.session.query(Transition).filter_by(member_id=member_id).order_by(Transition.id)]
+    return logged
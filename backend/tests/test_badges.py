@@ -0,0 +1,18 @@
+from werkzeug.datastructures import MultiDict
+
+
+def test_roster_filters_take_repeated_values_like_the_member_query(app, client, add_member):
+    from app import _filter_roster
+    added = [add_member('20230401', specialist='Badge A'), add_member('20230402', specialist='Badge B'),
+             add_member('20230403', specialist='Badge C')]
+    client.post('/api/checkin', json={'uid': '20230402'})
+
+    with app.app_context():
+        both = _filter_roster(MultiDict([('specialist', 'Badge A'), ('specialist', 'Badge B')]))
+        waiting = _filter_roster(MultiDict([('specialist', 'Badge A'), ('specialist', 'Badge B'),
+                                            ('state', 'Đã checkin'), ('state', 'Gọi PV')]))
+    assert [m['id'] for m in both] == [m['id'] for m in added[:2]]
+    assert [m['MSSV'] for m in waiting] == ['20230402']
+
+    query = client.get('/api/members?specialist=Badge A&specialist=Badge B&limit=10').get_json()
+    assert [m['id'] for m in query['members']] == [m['id'] for m in both]
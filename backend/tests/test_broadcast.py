@@ -0,0 +1,45 @@
+import threading
+import time
+
+from broadcast import BroadcastBatcher, DEFAULT_AUDIENCE, room
+
+BATCH_ROOM = room('batch', DEFAULT_AUDIENCE)
+
+
+class RecordingSocketIO:
+    """Records emits to the admin batch room; members_batch frames are slow to send"""
+
+    def __init__(self):
+        self.sent = []
+
+    def emit(self, event, data, to=None):
+        rooms = [to] if isinstance(to, str) else to
+        if BATCH_ROOM in rooms:
+            if event == 'members_batch':
+                time.sleep(0.1)
+            self.sent.append((event, data['version']))
+
+    def start_background_task(self, target, *args):
+        pass  # flushed explicitly by the tests
+
+
+def test_batch_clients_get_versions_in_order_when_a_flush_races_an_immediate_event():
+    socketio = RecordingSocketIO()
+    batcher = BroadcastBatcher(socketio, window_ms=50)
+    batcher.emit('member_checked_in', {'id': 1, 'version': 101, 'specialist': 'Tech'})
+
+    flusher = threading.Thread(target=batcher.flush)  # the window's background flush
+    flusher.start()
+    time.sleep(0.02)
+    batcher.emit('member_added', {'id': 2, 'version': 102, 'specialist': 'Tech'})
+    flusher.join()
+
+    assert socketio.sent == [('members_batch', 101), ('member_added', 102)]
+
+
+def test_immediate_event_flushes_pending_updates_first():
+    socketio = RecordingSocketIO()
+    batcher = BroadcastBatcher(socketio, window_ms=50)
+    batcher.emit('member_checked_in', {'id': 1, 'version': 101, 'specialist': 'Tech'})
+    batcher.emit('member_deleted', {'id': 1, 'version': 102}, previous_specialist='Tech')
+    assert socketio.sent == [('members_batch', 101), ('member_deleted', 102)]
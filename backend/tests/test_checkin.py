@@ -0,0 +1,59 @@
+import threading
+import time
+
+from checkin import CheckinDebouncer
+from write_pipeline import WriteOutcome
+
+
+def test_debouncer_runs_concurrent_scans_of_one_card_once():
+    debouncer = CheckinDebouncer(window=3)
+    calls, started = [], threading.Event()
+
+    def checkin():
+        calls.append(1)
+        started.set()
+        time.sleep(0.05)
+        return WriteOutcome({'message': 'Check-in successful'}, 200)
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(debouncer.run('20230100', checkin)))
+    first.start()
+    started.wait()
+    second = debouncer.run('20230100', checkin)
+    first.join()
+    third = debouncer.run('20230100', checkin)
+
+    assert len(calls) == 1
+    assert results[0][1] is False and second[1] is True and third[1] is True
+    assert second[0] is results[0][0] is third[0]
+
+
+def test_debouncer_does_not_remember_failures_or_other_cards():
+    debouncer = CheckinDebouncer(window=3)
+    outcomes = iter([WriteOutcome({'message': 'Member not found'}, 404), WriteOutcome({}, 200),
+                     WriteOutcome({}, 200)])
+    assert debouncer.run('20230101', lambda: next(outcomes))[0].status == 404
+    assert debouncer.run('20230101', lambda: next(outcomes))[1] is False
+    assert debouncer.run('20230102', lambda: next(outcomes))[1] is False
+
+
+def test_repeated_scans_write_and_broadcast_once(client, add_member, transitions):
+    member = add_member('20230110')
+    first = client.post('/api/checkin', json={'uid': '20230110'})
+    version = client.get('/api/members?since=0').get_json()['version']
+    again = client.post('/api/esp/checkin', json={'MSSV': '20230110'})
+
+    assert first.status_code == again.status_code == 200
+    assert again.get_json() == first.get_json()
+    assert client.get('/api/members?since=0').get_json()['version'] == version
+    assert [t[1] for t in transitions(member['id'])] == ['Đã checkin']
+
+
+def test_both_endpoints_reject_members_in_an_interview(client, add_member, transitions):
+    member = add_member('20230111')
+    assert client.put(f"/api/members/{member['id']}", json={'state': 'Đang phỏng vấn'}).status_code == 200
+    for url, body in (('/api/checkin', {'uid': '20230111'}), ('/api/esp/checkin', {'MSSV': '20230111'})):
+        response = client.post(url, json=body)
+        assert response.status_code == 400
+        assert 'interview' in response.get_json()['message']
+    assert [t[1] for t in transitions(member['id'])] == ['Đang phỏng vấn']
@@ -0,0 +1,95 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from cv_cache import CvCache, CvFetchError
+
+PDF = b'%PDF-1.4 candidate cv'
+
+
+class CvHost(BaseHTTPRequestHandler):
+    """Stand-in for the remote host of linkCV documents"""
+    requests = []
+    routes = {
+        '/cv.pdf': (200, {'Content-Type': 'application/pdf'}, PDF),
+        '/cv.html': (200, {'Content-Type': 'text/html'}, b'<script>alert(1)</script>'),
+        '/to-file': (302, {'Location': 'file:///etc/passwd'}, b''),
+        '/to-pdf': (302, {'Location': '/cv.pdf'}, b''),
+    }
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        status, headers, body = self.routes.get(self.path, (404, {}, b''))
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def cv_host():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CvHost)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+
+
+def test_downloads_once_and_serves_from_disk(tmp_path, cv_host):
+    cache = CvCache(str(tmp_path), workers=0, allow_private=True)
+    CvHost.requests.clear()
+    path, content_type = cache.get(f'{cv_host}/to-pdf')
+    assert cache.get(f'{cv_host}/to-pdf') == (path, content_type)
+    assert content_type == 'application/pdf'
+    with open(path, 'rb') as f:
+        assert f.read() == PDF
+    assert CvHost.requests == ['/to-pdf', '/cv.pdf']
+
+
+@pytest.mark.parametrize('link', ['file:///etc/passwd', 'ftp://127.0.0.1/cv.pdf', 'data:,secret'])
+def test_only_http_links_are_fetched(tmp_path, link):
+    with pytest.raises(CvFetchError):
+        CvCache(str(tmp_path), workers=0, allow_private=True).get(link)
+    assert not [name for name in tmp_path.iterdir() if not name.name.startswith('.')]
+
+
+def test_redirect_to_file_is_refused(tmp_path, cv_host):
+    with pytest.raises(CvFetchError):
+        CvCache(str(tmp_path), workers=0, allow_private=True).get(f'{cv_host}/to-file')
+
+
+@pytest.mark.parametrize('link', ['{host}/cv.pdf', 'http://localhost:{port}/cv.pdf',
+                                  'http://169.254.169.254/latest/meta-data/', 'http://10.0.0.1/', 'http://[::1]/'])
+def test_private_addresses_are_refused(tmp_path, cv_host, link):
+    CvHost.requests.clear()
+    with pytest.raises(CvFetchError, match='not a public address'):
+        CvCache(str(tmp_path), workers=0).get(link.format(host=cv_host, port=cv_host.rsplit(':', 1)[1]))
+    assert CvHost.requests == []
+
+
+def test_endpoint_serves_only_pdfs_and_images_inline(app, client, cv_host, monkeypatch):
+    from app import cv_cache
+    monkeypatch.setattr(cv_cache, 'allow_private', True)
+    ids = {}
+    for mssv, link in (('CV001', f'{cv_host}/cv.pdf'), ('CV002', f'{cv_host}/cv.html'),
+                       ('CV003', 'file:///etc/passwd')):
+        response = client.post('/api/members', json={'name': mssv, 'MSSV': mssv, 'linkCV': link})
+        ids[mssv] = response.get_json()['member']['id']
+
+    response = client.get(f"/api/members/{ids['CV001']}/cv")
+    assert response.status_code == 200 and response.mimetype == 'application/pdf'
+    assert response.data == PDF
+
+    response = client.get(f"/api/members/{ids['CV002']}/cv")
+    assert response.mimetype == 'application/octet-stream'
+    assert response.headers['Content-Disposition'].startswith('attachment')
+    assert response.headers['X-Content-Type-Options'] == 'nosniff'
+
+    response = client.get(f"/api/members/{ids['CV003']}/cv")
+    assert response.status_code == 502
+    assert b'root:' not in response.data
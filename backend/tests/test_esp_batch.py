@@ -0,0 +1,72 @@
+import time
+
+BATCH_URL = '/api/esp/checkin/batch'
+
+
+def _scan(mssv, scanned_at, device_id='esp-1'):
+    return {'MSSV': mssv, 'device_id': device_id, 'scanned_at': scanned_at}
+
+
+def _statuses(response):
+    assert response.status_code == 200, response.get_json()
+    return [result['status'] for result in response.get_json()['results']]
+
+
+def test_retransmitted_batch_is_a_duplicate_and_changes_nothing(client, add_member, transitions):
+    member = add_member('20230301')
+    batch = [_scan('20230301', int(time.time()) - 30), {'MSSV': ''}, _scan('20239999', int(time.time()))]
+    assert _statuses(client.post(BATCH_URL, json=batch)) == ['checked_in', 'invalid', 'not_found']
+    logged = transitions(member['id'])
+
+    again = client.post(BATCH_URL, json=batch)
+    assert _statuses(again) == ['duplicate', 'invalid', 'not_found']
+    assert again.get_json()['checked_in'] == 0
+    assert transitions(member['id']) == logged == [('Chưa checkin', 'Đã checkin', batch[0]['scanned_at'], 'ESP')]
+
+
+def test_scan_older_than_a_later_change_is_stale(client, add_member, transitions):
+    member = add_member('20230302', specialist='Batch test')
+    now = int(time.time())
+    assert _statuses(client.post(BATCH_URL, json=[_scan('20230302', now - 100)])) == ['checked_in']
+    assert client.post('/api/queue/Batch test/next').get_json()['member']['id'] == member['id']
+
+    response = client.post(BATCH_URL, json=[_scan('20230302', now - 50)])
+    assert _statuses(response) == ['stale']
+    assert [t[1] for t in transitions(member['id'])] == ['Đã checkin', 'Gọi PV']
+    assert client.get('/api/members?q=20230302').get_json()['members'][0]['state'] == 'Gọi PV'
+
+
+def test_member_scanned_twice_in_one_batch(client, add_member, transitions):
+    first, second = add_member('20230303'), add_member('20230304')
+    now = int(time.time())
+    # Within the debounce window the repeat collapses into the first scan
+    response = client.post(BATCH_URL, json=[_scan('20230303', now - 9), _scan('20230303', now - 10)])
+    assert _statuses(response) == ['duplicate', 'checked_in']
+    assert [t[2] for t in transitions(first['id'])] == [now - 10]
+
+    # Further apart it is a new scan, which restarts the wait as a single scan does
+    response = client.post(BATCH_URL, json=[_scan('20230304', now - 100), _scan('20230304', now - 40)])
+    assert _statuses(response) == ['checked_in', 'checked_in']
+    assert [(t[0], t[1], t[2]) for t in transitions(second['id'])] == [
+        ('Chưa checkin', 'Đã checkin', now - 100), ('Đã checkin', 'Đã checkin', now - 40)]
+
+
+def test_batch_follows_the_single_scan_rules(client, add_member, transitions):
+    busy, fresh = add_member('20230305'), add_member('20230306')
+    client.put(f"/api/members/{busy['id']}", json={'state': 'Đang phỏng vấn'})
+    single = client.post('/api/esp/checkin', json={'MSSV': '20230305'}).get_json()
+
+    now = int(time.time())
+    results = client.post(BATCH_URL, json=[_scan('20230305', now), _scan('20230306', now)]).get_json()['results']
+    assert results[0]['status'] == 'rejected'
+    assert results[0]['message'] == single['message']
+    assert [t[1] for t in transitions(busy['id'])] == ['Đang phỏng vấn']
+
+    # The debouncer covers both paths: a single scan right after the batch is collapsed into it
+    batch_checkin = client.get('/api/members?q=20230306').get_json()['members'][0]['checkin_time']
+    response = client.post('/api/checkin', json={'uid': '20230306'})
+    assert response.status_code == 200
+    assert response.get_json()['member']['checkin_time'] == batch_checkin
+    assert len(transitions(fresh['id'])) == 1
+    assert _statuses(client.post(BATCH_URL, json=[_scan('20230306', now + 1)])) == ['duplicate']
+    assert len(transitions(fresh['id'])) == 1
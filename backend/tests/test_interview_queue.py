@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+
+SPECIALIST = 'Queue test'
+
+
+def _checked_in(client, add_member, mssvs):
+    members = []
+    for mssv in mssvs:
+        member = add_member(mssv, specialist=SPECIALIST)
+        assert client.post('/api/checkin', json={'uid': mssv}).status_code == 200
+        members.append(member)
+    return members
+
+
+def test_queue_lists_and_calls_the_longest_waiting_first(client, add_member):
+    members = _checked_in(client, add_member, ['20230201', '20230202', '20230203'])
+    queue = client.get(f'/api/queue/{SPECIALIST}').get_json()
+    assert queue['length'] == 3
+    assert [m['id'] for m in queue['members']] == [m['id'] for m in members]
+
+    called = [client.post(f'/api/queue/{SPECIALIST}/next').get_json()['member'] for _ in members]
+    assert [m['id'] for m in called] == [m['id'] for m in members]
+    assert {m['state'] for m in called} == {'Gọi PV'}
+
+    empty = client.post(f'/api/queue/{SPECIALIST}/next')
+    assert empty.status_code == 409
+    assert empty.get_json()['message'] == 'No candidate waiting'
+
+
+def test_concurrent_calls_claim_different_candidates(app, client, add_member, transitions):
+    members = _checked_in(client, add_member, [f'2023021{i}' for i in range(6)])
+
+    def call_next(_):
+        response = app.test_client().post(f'/api/queue/{SPECIALIST}/next')
+        return response.status_code, response.get_json()
+
+    with ThreadPoolExecutor(10) as pool:
+        responses = list(pool.map(call_next, range(10)))
+
+    called = [body['member']['id'] for status, body in responses if status == 200]
+    assert sorted(called) == sorted(m['id'] for m in members)
+    assert [status for status, _ in responses].count(409) == 4
+    for member in members:
+        assert [t[1] for t in transitions(member['id'])] == ['Đã checkin', 'Gọi PV']
+    assert client.get(f'/api/queue/{SPECIALIST}').get_json()['length'] == 0
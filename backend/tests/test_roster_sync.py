@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from roster import RosterCache
+from roster_sync import RosterSync
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+class ThreadingSocketIO:
+    """The part of SocketIO that RosterSync.start() uses"""
+
+    def start_background_task(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        return thread
+
+
+def _worker(server, members):
+    roster = RosterCache(lambda: [dict(member) for member in members])
+    sync = RosterSync(fakeredis.FakeRedis(server=server), roster)
+    sync.start(ThreadingSocketIO())
+    roster.attach_sync(sync)
+    roster.ensure_loaded()
+    return roster
+
+
+def _wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError('change was not applied in time')
+        time.sleep(0.01)
+
+
+def test_changes_reach_other_workers_with_shared_versions():
+    server = fakeredis.FakeServer()
+    members = [{'id': 1, 'name': 'An', 'state': 'Chưa checkin'}]
+    first, second = _worker(server, members), _worker(server, members)
+    start = first.version
+    assert second.version == start
+
+    version = first.upsert({'id': 1, 'name': 'An', 'state': 'Đã checkin'})
+    assert version == start + 1
+    _wait_for(lambda: second.get(1)['state'] == 'Đã checkin')
+    assert second.version == version
+
+    # A version from one worker means the same on the other
+    deleted = second.remove(1)
+    assert deleted == version + 1
+    _wait_for(lambda: first.get(1) is None)
+    _, changes = first.changes_since(start)
+    assert changes == [{'type': 'delete', 'id': 1, 'version': deleted}]
+
+
+def test_worker_ignores_its_own_published_changes():
+    server = fakeredis.FakeServer()
+    roster = _worker(server, [])
+    version = roster.upsert({'id': 7, 'name': 'Bình'})
+    time.sleep(0.1)
+    _, changes = roster.changes_since(version - 1)
+    assert changes == [{'type': 'upsert', 'member': {'id': 7, 'name': 'Bình'}, 'version': version}]
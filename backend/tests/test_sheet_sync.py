@@ -0,0 +1,120 @@
+import csv
+import importlib.util
+import os
+import sqlite3
+
+import pytest
+
+IMPORT_SCRIPT = os.path.join(os.path.dirname(__file__), '..', '..', 'import.py')
+HEADER = ['Timestamp', 'Họ tên', 'MSSV/Trường', 'Ngành/Lớp', 'Email', 'SĐT', 'Loại SV', 'Mảng chính',
+          'Mảng phụ', 'File name', 'linkCV', 'File size', 'Câu hỏi', 'Trạng thái']
+
+
+@pytest.fixture(scope='module')
+def sheet_import():
+    # import.py is a script whose name is a keyword, so load it by path
+    spec = importlib.util.spec_from_file_location('sheet_import', IMPORT_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def server(client, monkeypatch, sheet_import):
+    """Route import.py's requests.post to the app's test client"""
+    class Response:
+        def __init__(self, response):
+            self.response = response
+
+        def raise_for_status(self):
+            assert self.response.status_code == 200, self.response.get_json()
+
+        def json(self):
+            return self.response.get_json()
+
+    def post(url, json, timeout):
+        return Response(client.post(url[url.index('/api/'):], json=json))
+
+    monkeypatch.setattr(sheet_import.requests, 'post', post)
+    return 'http://server'
+
+
+def _write_sheet(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for timestamp, name, mssv, specialist in rows:
+            writer.writerow([timestamp, name, mssv, 'K68', f'{mssv}@sis.hust.edu.vn', '', 'SV', specialist,
+                             '', '', f'https://cv.example/{mssv}', '', '', 'Duyệt'])
+
+
+def test_sync_from_csv_upserts_changes_and_keeps_live_state(tmp_path, client, server, sheet_import):
+    sheet, state = tmp_path / 'sheet.csv', str(tmp_path / 'state.json')
+    _write_sheet(sheet, [('1/9/2025 10:00:00', 'Nguyễn Văn A', '20230001', 'Tech'),
+                         ('1/9/2025 10:05:00', 'Trần Thị B', '20230002', 'Media')])
+    result = sheet_import.sync_sheet_to_server(sheet_import.load_sheet(str(sheet)), server, state)
+    assert (result['added'], result['updated'], result['errors']) == (2, 0, [])
+
+    members = {m['MSSV']: m for m in client.get('/api/members').get_json()}
+    assert client.post('/api/checkin', json={'uid': '20230001'}).status_code == 200
+
+    # Only the row whose Timestamp changed is sent again
+    _write_sheet(sheet, [('1/9/2025 11:00:00', 'Nguyễn Văn An', '20230001', 'Tech'),
+                         ('1/9/2025 10:05:00', 'Trần Thị B', '20230002', 'Media')])
+    result = sheet_import.sync_sheet_to_server(sheet_import.load_sheet(str(sheet)), server, state)
+    assert (result['added'], result['updated'], result['unchanged']) == (0, 1, 0)
+
+    member = client.get('/api/members?q=20230001').get_json()['members'][0]
+    assert member['id'] == members['20230001']['id']
+    assert member['name'] == 'Nguyễn Văn An'
+    assert member['state'] == 'Đã checkin'
+
+
+def test_rows_rejected_by_the_server_are_sent_again(tmp_path, server, sheet_import, monkeypatch):
+    sheet, state = tmp_path / 'sheet.csv', str(tmp_path / 'state.json')
+    _write_sheet(sheet, [('1/9/2025 12:00:00', 'Lê Văn C', '20230003', 'Tech'),
+                         ('1/9/2025 12:01:00', 'Phạm Thị D', '20230004', 'Tech')])
+    post = sheet_import.requests.post
+
+    def reject_d(url, json, timeout):
+        rows = [row for row in json['rows'] if row['MSSV'] != '20230004']
+        response = post(url, {'rows': rows}, timeout)
+        body = response.json()
+        body['errors'] = [{'row': row, 'message': 'Rejected'} for row in json['rows'] if row['MSSV'] == '20230004']
+        response.json = lambda: body
+        return response
+
+    monkeypatch.setattr(sheet_import.requests, 'post', reject_d)
+    result = sheet_import.sync_sheet_to_server(sheet_import.load_sheet(str(sheet)), server, state)
+    assert result['added'] == 1 and len(result['errors']) == 1
+    assert sheet_import.load_sync_state(state) == {'20230003': '1/9/2025 12:00:00'}
+
+    monkeypatch.setattr(sheet_import.requests, 'post', post)
+    result = sheet_import.sync_sheet_to_server(sheet_import.load_sheet(str(sheet)), server, state)
+    assert (result['added'], result['updated'], result['unchanged']) == (1, 0, 0)
+
+
+def test_full_reimport_drops_the_history_of_the_old_ids(tmp_path, sheet_import):
+    from sqlalchemy import create_engine
+
+    from storage import migrate
+
+    path = tmp_path / 'members.db'
+    engine = create_engine(f'sqlite:///{path}')
+    migrate(engine)
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO Member (name, MSSV, state) VALUES ('Cũ', '20220001', 'Đã checkin')")
+    conn.execute("INSERT INTO transition (member_id, specialist, from_state, to_state, at, source) "
+                 "VALUES (1, 'Tech', 'Chưa checkin', 'Đã checkin', 1700000000, 'desk')")
+    conn.commit()
+
+    sheet_import.reset_member_table(conn)
+    conn.execute("INSERT INTO Member (name, MSSV, state) VALUES ('Mới', '20230001', 'Chưa checkin')")
+    conn.commit()
+    conn.close()
+    migrate(engine)  # as the app does on startup
+
+    conn = sqlite3.connect(path)
+    assert conn.execute('SELECT id FROM Member').fetchall() == [(1,)]
+    assert conn.execute('SELECT COUNT(*) FROM transition').fetchone() == (0,)
+    conn.close()
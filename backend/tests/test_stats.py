@@ -0,0 +1,43 @@
+import random
+from datetime import datetime, timedelta
+
+from interview_queue import CHECKIN_TIME_FORMAT
+from stats import INTERVIEW_STATES, RosterStats
+
+START = datetime(2025, 9, 1, 8, 0)
+STATES = ('Chưa checkin', 'Đã checkin') + INTERVIEW_STATES
+
+
+def _member(member_id, rng):
+    state = rng.choice(STATES)
+    checkin = START + timedelta(minutes=rng.randrange(60))
+    called = checkin + timedelta(minutes=rng.randrange(1, 60))
+    return {
+        'id': member_id,
+        'specialist': rng.choice(('Tech', 'Media', None)),
+        'state': state,
+        'checkin_time': None if state == 'Chưa checkin' else checkin.strftime(CHECKIN_TIME_FORMAT),
+        'called_time': called.strftime(CHECKIN_TIME_FORMAT) if state in INTERVIEW_STATES else None,
+    }
+
+
+def test_incremental_counters_match_a_rebuild():
+    rng = random.Random(7)
+    members = {i: _member(i, rng) for i in range(200)}
+    stats = RosterStats()
+    stats.reset(list(members.values()))
+    for _ in range(2000):
+        member_id = rng.randrange(250)
+        if member_id in members and rng.random() < 0.2:
+            del members[member_id]
+            stats.update(member_id, None)
+        else:
+            members[member_id] = _member(member_id, rng)
+            stats.update(member_id, members[member_id])
+
+    rebuilt = RosterStats()
+    rebuilt.reset(list(members.values()))
+    now = START + timedelta(hours=3)
+    snapshot = stats.snapshot(now)
+    assert snapshot['interviews_per_hour'] is not None
+    assert snapshot == rebuilt.snapshot(now)
@@ -1,12 +1,17 @@
-from app import app, socketio, db
+from app import app, socketio, db, roster
+from storage import migrate
 import logging
 import os
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG,
-                   format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Logging is configured by app (see logs.configure_logging)
 logger = logging.getLogger(__name__)
 
+def init_db():
+    """Apply pending schema migrations (see storage.MIGRATIONS)"""
+    with app.app_context():
+        version = migrate(db.engine)
+        logger.info("Database schema at version %s", version)
+
 if __name__ == "__main__":
     logger.info("Starting application with threading mode")
     try:
@@ -14,20 +19,18 @@ if __name__ == "__main__":
         from flask_cors import CORS
         CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
         
-        # Create database tables if they don't exist
+        init_db()
         with app.app_context():
-            # Recreate the database to ensure the new columns are present
-            # db.drop_all()  # This will drop all existing tables
-            db.create_all()
-            logger.info("Database tables created/updated successfully")
+            # Warm the roster cache so the first client doesn't pay for the load
+            logger.info("Roster cache loaded: %s members", len(roster.members()))
         
         socketio.run(
             app,
             host='0.0.0.0',
-            port=8091,
+            port=int(os.environ.get('PORT', '8091')),
             debug=False,
             use_reloader=False,
             allow_unsafe_werkzeug=True
         )
     except Exception as e:
-        logger.error(f"Error starting the application: {e}")
\ No newline at end of file
+        logger.error("Error starting the application: %s", e)
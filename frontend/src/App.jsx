@@ -30,6 +30,8 @@ function App() {
   const [isRegistering, setIsRegistering] = useState(false);
   const toast = useToast();
   const socketRef = useRef(null);
+  // Last roster version applied locally; sent on (re)connect to get only the delta
+  const versionRef = useRef(null);
 
   const isDesktop = useBreakpointValue({ base: false, lg: true });
 
@@ -39,21 +41,62 @@ function App() {
       // Create socket instance with better error handling
       try {
         socketRef.current = io(BASE_URL, {
+          auth: (cb) => cb({ since: versionRef.current, batch: true, format: 'columns' }),
           reconnectionAttempts: 5,
           timeout: 10000,
           transports: ['websocket', 'polling'] // Try WebSocket first, then polling
         });
         const socket = socketRef.current;
+
+        // Member lists arrive as {fields, rows} over the socket (format: 'columns')
+        // and as a plain array from the HTTP API
+        const decodeMembers = (members) => (
+          Array.isArray(members)
+            ? members
+            : members.rows.map(row => Object.fromEntries(members.fields.map((field, i) => [field, row[i]])))
+        );
+
+        // Apply a members_sync payload: a full snapshot or the changes since our version
+        const applySync = (payload) => {
+          console.log('Received members sync:', payload);
+          if (payload.full) {
+            setMembers(decodeMembers(payload.members));
+          } else if (payload.changes.length > 0) {
+            setMembers(prevMembers => {
+              const byId = new Map(prevMembers.map(member => [member.id, member]));
+              payload.changes.forEach(change => {
+                if (change.type === 'delete') {
+                  byId.delete(change.id);
+                } else {
+                  byId.set(change.member.id, change.member);
+                }
+              });
+              return Array.from(byId.values());
+            });
+          }
+          versionRef.current = payload.version;
+        };
+
+        // HTTP fallback when the real-time connection can't be established
+        const fetchMembers = async () => {
+          try {
+            const since = versionRef.current;
+            const response = await api.get('/api/members', { params: { since: since ?? 0 } });
+            applySync(response.data);
+          } catch (error) {
+            console.error('Error fetching members:', error);
+          }
+        };
         
         // Handle connection events
         socket.on('connect', () => {
+          // The server answers the connect auth with a members_sync (delta or full snapshot)
           console.log('Connected to WebSocket server');
-          // Request latest data after connection
-          socket.emit('request_update');
         });
         
         socket.on('connect_error', (error) => {
           console.error('Socket connection error:', error);
+          fetchMembers();
           toast({
             title: "Connection Error",
             description: "Failed to establish real-time connection. Some features may not work correctly.",
@@ -67,6 +110,13 @@ function App() {
           console.log('Disconnected from WebSocket server');
         });
         
+        // Every member_* event carries the roster version it produced
+        socket.onAny((event, data) => {
+          if (event.startsWith('member_') && data && data.version) {
+            versionRef.current = Math.max(versionRef.current || 0, data.version);
+          }
+        });
+
         // Handle member updates
         socket.on('member_added', (newMember) => {
           console.log('Member added:', newMember);
@@ -182,7 +232,20 @@ function App() {
         
         socket.on('members_list', (membersList) => {
           console.log('Received updated members list:', membersList);
-          setMembers(membersList);
+          setMembers(decodeMembers(membersList));
+        });
+
+        socket.on('members_sync', applySync);
+
+        // Coalesced member updates: replay each one through the per-event handlers above
+        socket.on('members_batch', (batch) => {
+          console.log('Received members batch:', batch);
+          batch.updates.forEach(({ member, events }) => {
+            events.forEach(event => {
+              socket.listeners(event).forEach(handler => handler(member));
+            });
+          });
+          versionRef.current = Math.max(versionRef.current || 0, batch.version);
         });
         
         socket.on('error', (error) => {
@@ -196,19 +259,6 @@ function App() {
           });
         });
         
-        // Fetch initial data via HTTP
-        const fetchMembers = async () => {
-          try {
-            const response = await api.get('/api/members');
-            setMembers(response.data);
-            console.log("Fetched members via HTTP:", response.data);
-          } catch (error) {
-            console.error('Error fetching members:', error);
-          }
-        };
-
-        fetchMembers();
-        
         // Clean up on unmount
         return () => {
           socket.disconnect();
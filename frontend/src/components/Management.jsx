@@ -255,6 +255,43 @@ const Management = ({ members, setMembers }) => {
     }
   };
 
+  // Let the server pick the longest-waiting candidate of the selected specialist,
+  // so two interviewers never call the same person
+  const handleCallNext = async () => {
+    try {
+      const response = await api.post(`/api/queue/${encodeURIComponent(filterConfig.specialist)}/next`);
+      const member = response.data.member;
+      setMembers((prevMembers) =>
+        prevMembers.map((m) => (m.id === member.id ? member : m))
+      );
+      toast({
+        title: `${member.name} được gọi phỏng vấn`,
+        description: 'Thành viên đã được gọi phỏng vấn',
+        status: 'info',
+        duration: 3000,
+        isClosable: true,
+      });
+    } catch (error) {
+      if (error.response?.status === 409) {
+        toast({
+          title: 'Không còn ứng viên chờ phỏng vấn',
+          status: 'info',
+          duration: 3000,
+          isClosable: true,
+        });
+        return;
+      }
+      console.error('Error calling next candidate:', error);
+      toast({
+        title: "Error",
+        description: "Could not call the next candidate",
+        status: "error",
+        duration: 3000,
+        isClosable: true,
+      });
+    }
+  };
+
   return (
     <Container maxW={'2000px'} my={4} display="flex" flexDirection="column" height="calc(100vh - 160px)" overflow="hidden" borderRadius="md">
       <Text
@@ -306,6 +343,11 @@ const Management = ({ members, setMembers }) => {
           ))}
         </Select>
         <Button colorScheme="teal" onClick={() => openEditModal()} borderRadius="md"mt={4} mb={0}>Add Member</Button>
+        {filterConfig.specialist && (
+          <Button colorScheme="blue" onClick={handleCallNext} borderRadius="md" mt={4} mb={0} ml={2}>
+            Gọi PV tiếp theo
+          </Button>
+        )}
       </Box>
       <Box overflowY="auto" flex="1" borderRadius="md">
         <Table variant="simple" borderRadius="md">
@@ -1,6 +1,9 @@
+import argparse
 import csv
+import json
 import sqlite3
 import os
+import time
 import requests
 from io import StringIO
 import pandas as pd
@@ -8,6 +11,8 @@ from datetime import datetime
 
 # Database path - đồng bộ với app.py
 db_file = 'backend/instance/memberlist251.db'
+# Timestamp đã đồng bộ của từng MSSV, dùng cho chế độ --sync
+sync_state_file = 'backend/instance/sheet_sync_state.json'
 def get_google_sheet_data(sheet_url):
     """
     Lấy dữ liệu từ Google Sheets public
@@ -78,16 +83,60 @@ def create_table(conn):
             linkCV TEXT,
             checkin_time TEXT,
             state TEXT,
-            note TEXT
+            note TEXT,
+            source_timestamp TEXT
         )
     ''')
     conn.commit()
 
-def import_data_from_google_sheet(conn, df):
-    """Imports data from Google Sheets DataFrame into the database."""
-    default_check_in_state = 'Chưa checkin'
-    cursor = conn.cursor()
-    
+def reset_member_table(conn):
+    """Xóa và tạo lại bảng Member cùng lịch sử trạng thái trong một transaction.
+
+    id bắt đầu lại từ 1 nên lịch sử cũ (theo member_id) sẽ bị gán nhầm cho ứng
+    viên mới; lịch sử cũ vẫn còn trong bản backup tạo trước khi import.
+    """
+    conn.execute("BEGIN")
+    conn.execute("DROP TABLE IF EXISTS Member")
+    conn.execute("DROP TABLE IF EXISTS transition")
+    # Bảng mới chưa có index: để app chạy lại migration khi khởi động
+    conn.execute("PRAGMA user_version = 0")
+    create_table(conn)  # commit
+
+# Cột lấy từ sheet: (tên cột trong DB, tên cột trong sheet, vị trí dự phòng)
+IMPORT_COLUMNS = [
+    ('source_timestamp', 'Timestamp', 0),
+    ('name', 'Họ tên', 1),
+    ('MSSV', 'MSSV/Trường', 2),
+    ('email', 'Email', 4),
+    ('specialist', 'Mảng chính', 7),
+    ('linkCV', 'linkCV', 10),
+]
+
+def _clean_column(series):
+    """Chuẩn hóa một cột thành chuỗi đã strip, ô trống/NaN thành None"""
+    # MSSV dạng số bị pandas đọc thành float (20238445.0) khi có ô trống
+    if pd.api.types.is_float_dtype(series):
+        values = series.dropna()
+        if (values % 1 == 0).all():
+            series = series.astype('Int64')
+    cleaned = series.astype('string').str.strip()
+    empty = (cleaned.isna() | (cleaned == '') | (cleaned == 'nan')).fillna(True).astype(bool)
+    return cleaned.astype(object).where(~empty, None)
+
+def _report_skipped(label, rows, max_rows=20):
+    """In các dòng bị bỏ qua theo từng lý do (số dòng theo Google Sheets)"""
+    if len(rows) == 0:
+        return
+    shown = ', '.join(str(r) for r in rows[:max_rows])
+    more = f" ... (+{len(rows) - max_rows} dòng)" if len(rows) > max_rows else ''
+    print(f"Bỏ qua {len(rows)} dòng - {label}: {shown}{more}")
+
+def prepare_import_frame(df, existing_mssv=(), keep='first'):
+    """Lọc và chuẩn hóa dữ liệu sheet bằng pandas.
+
+    keep='last' giữ lần đăng ký mới nhất khi một MSSV xuất hiện nhiều lần.
+    Trả về (DataFrame sẵn sàng để insert, số dòng bị bỏ qua).
+    """
     # Tên các cột dựa trên dữ liệu mẫu
     expected_columns = [
         'Timestamp', 'Họ tên', 'MSSV/Trường', 'Ngành/Lớp', 'Email', 'SĐT', 
@@ -95,82 +144,86 @@ def import_data_from_google_sheet(conn, df):
         'File size', 'Câu hỏi', 'Trạng thái'
     ]
     
+    df = df.copy()
     # Đặt tên cột cho DataFrame nếu cần
     if len(df.columns) >= len(expected_columns):
-        df.columns = expected_columns[:len(df.columns)]
-    elif len(df.columns) < len(expected_columns):
+        df.columns = expected_columns + list(df.columns[len(expected_columns):])
+    else:
         print(f"Cảnh báo: Chỉ có {len(df.columns)} cột, mong đợi {len(expected_columns)} cột")
-        # Sử dụng tên cột hiện tại nếu không đủ
-        pass
-    
-    # Đếm số bản ghi đã thêm và bỏ qua
-    added_count = 0
+    # Số dòng tương ứng trong Google Sheets (dòng 1 là header)
+    row_numbers = pd.Series(range(2, len(df) + 2), index=df.index)
     skipped_count = 0
-    
-    for index, row in df.iterrows():
-        try:
-            # Kiểm tra cột "Trạng thái" (cột thứ 14 - index 13)
-            status_col = 'Trạng thái' if 'Trạng thái' in df.columns else df.columns[-1] if len(df.columns) >= 14 else None
-            
-            if status_col:
-                status = str(row.get(status_col, '')).strip()
-                if status != 'Duyệt':
-                    print(f"Bỏ qua dòng {index + 2}: Trạng thái = '{status}' (không phải 'Duyệt')")
-                    skipped_count += 1
-                    continue
-            else:
-                print(f"Cảnh báo: Không tìm thấy cột trạng thái, import tất cả dữ liệu")
-            
-            # Lấy dữ liệu từ các cột cần thiết với fallback
-            name = str(row.get('Họ tên', row.iloc[1] if len(row) > 1 else '')).strip()
-            mssv = str(row.get('MSSV/Trường', row.iloc[2] if len(row) > 2 else '')).strip()
-            email = str(row.get('Email', row.iloc[4] if len(row) > 4 else '')).strip()
-            link_cv = str(row.get('linkCV', row.iloc[10] if len(row) > 10 else '')).strip()
-            specialist = str(row.get('Mảng chính', row.iloc[7] if len(row) > 7 else '')).strip()
-            
-            # Kiểm tra dữ liệu bắt buộc
-            if not name or not mssv:
-                print(f"Bỏ qua dòng {index + 2}: Thiếu họ tên hoặc MSSV (name='{name}', mssv='{mssv}')")
-                skipped_count += 1
-                continue
-            
-            # Kiểm tra duplicate MSSV
-            cursor.execute('SELECT COUNT(*) FROM Member WHERE MSSV = ?', (mssv,))
-            if cursor.fetchone()[0] > 0:
-                print(f"Bỏ qua dòng {index + 2}: MSSV '{mssv}' đã tồn tại")
-                skipped_count += 1
-                continue
-            
-            cursor.execute('''
-                INSERT INTO Member (name, MSSV, email, specialist, linkCV, checkin_time, state, note) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                name,
-                mssv,
-                email if email != 'nan' else None,
-                specialist if specialist != 'nan' else None,
-                link_cv if link_cv != 'nan' else None,
-                None,  # checkin_time
-                default_check_in_state,
-                'N/A'  # note
-            ))
-            
-            added_count += 1
-            print(f"Đã thêm: {name} - {mssv} - {specialist}")
-            
-        except Exception as e:
-            print(f"Lỗi khi xử lý dòng {index + 2}: {e}")
-            print(f"Dữ liệu dòng: {dict(row)}")
-            skipped_count += 1
-            continue
-    
-    conn.commit()
+
+    # Kiểm tra cột "Trạng thái" (cột thứ 14 - index 13), chỉ xác định một lần
+    status_col = 'Trạng thái' if 'Trạng thái' in df.columns else df.columns[-1] if len(df.columns) >= 14 else None
+    if status_col is not None:
+        approved = df[status_col].astype('string').str.strip() == 'Duyệt'
+        approved = approved.fillna(False).astype(bool)
+        _report_skipped("Trạng thái không phải 'Duyệt'", row_numbers[~approved].tolist())
+        skipped_count += int((~approved).sum())
+        df = df[approved]
+    else:
+        print("Cảnh báo: Không tìm thấy cột trạng thái, import tất cả dữ liệu")
+
+    # Lấy dữ liệu từ các cột cần thiết với fallback theo vị trí
+    data = {}
+    for field, column, position in IMPORT_COLUMNS:
+        if column in df.columns:
+            source = df[column]
+        elif len(df.columns) > position:
+            source = df.iloc[:, position]
+        else:
+            source = pd.Series(None, index=df.index, dtype=object)
+        data[field] = _clean_column(source)
+    members = pd.DataFrame(data, index=df.index)
+
+    # Kiểm tra dữ liệu bắt buộc
+    missing = members['name'].isna() | members['MSSV'].isna()
+    _report_skipped("Thiếu họ tên hoặc MSSV", row_numbers[members.index[missing]].tolist())
+    skipped_count += int(missing.sum())
+    members = members[~missing]
+
+    # Kiểm tra duplicate MSSV: trùng trong sheet hoặc đã có trong DB
+    duplicated = members['MSSV'].duplicated(keep=keep) | members['MSSV'].isin(set(existing_mssv))
+    _report_skipped("MSSV đã tồn tại", row_numbers[members.index[duplicated]].tolist())
+    skipped_count += int(duplicated.sum())
+    members = members[~duplicated]
+
+    return members, skipped_count
+
+def import_data_from_google_sheet(conn, df):
+    """Imports data from Google Sheets DataFrame into the database."""
+    default_check_in_state = 'Chưa checkin'
+    cursor = conn.cursor()
+    existing_mssv = {row[0] for row in cursor.execute('SELECT MSSV FROM Member')}
+
+    members, skipped_count = prepare_import_frame(df, existing_mssv)
+    rows = list(zip(
+        members['name'], members['MSSV'], members['email'], members['specialist'], members['linkCV'],
+        members['source_timestamp'],
+    ))
+
+    added_count = 0
+    try:
+        # Một transaction, một lệnh executemany cho toàn bộ dữ liệu
+        with conn:
+            conn.executemany(
+                'INSERT INTO Member (name, MSSV, email, specialist, linkCV, source_timestamp, checkin_time, state, note) '
+                'VALUES (?, ?, ?, ?, ?, ?, NULL, ?, ?)',
+                [row + (default_check_in_state, 'N/A') for row in rows]
+            )
+        added_count = len(rows)
+    except Exception as e:
+        print(f"Lỗi khi ghi dữ liệu vào database, đã rollback toàn bộ: {e}")
+        skipped_count += len(rows)
+
     print(f"\n{'='*50}")
     print(f"KẾT QUẢ IMPORT:")
     print(f"- Đã thêm thành công: {added_count} bản ghi")
     print(f"- Bỏ qua: {skipped_count} bản ghi")
     print(f"- Tổng cộng xử lý: {added_count + skipped_count} dòng")
     print(f"{'='*50}")
+    return added_count, skipped_count
 
 def show_database_stats(conn):
     """Hiển thị thống kê database sau khi import"""
@@ -294,8 +347,7 @@ def main():
     conn = sqlite3.connect(db_file)
     
     # Drop and recreate table to reset
-    conn.execute("DROP TABLE IF EXISTS Member")
-    create_table(conn)
+    reset_member_table(conn)
     
     # Import data from Google Sheets
     import_data_from_google_sheet(conn, df)
@@ -308,5 +360,103 @@ def main():
     
     print(f"\nData imported from Google Sheets to '{db_file}' successfully.")
 
+def load_sheet(source):
+    """Đọc sheet từ file CSV local hoặc từ URL Google Sheets"""
+    if os.path.exists(source):
+        df = pd.read_csv(source, on_bad_lines='skip').dropna(how='all')
+        if len(df.columns) > 14:
+            df = df.iloc[:, :14]
+        return df
+    return get_google_sheet_data(source)
+
+def load_sync_state(path):
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    return {}
+
+def save_sync_state(path, state):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def sync_sheet_to_server(df, server_url, state_path=sync_state_file, chunk_size=500):
+    """Đẩy các dòng mới hoặc đã thay đổi (theo MSSV + Timestamp) lên server đang chạy.
+
+    Server chỉ cập nhật họ tên, email, mảng và linkCV; trạng thái, giờ checkin
+    và ghi chú của ứng viên đã xử lý được giữ nguyên. Client đang kết nối nhận
+    member_added/member_edited như khi thêm/sửa trên web.
+    """
+    members, skipped_count = prepare_import_frame(df, keep='last')
+    state = load_sync_state(state_path)
+    changed = [
+        mssv not in state or state[mssv] != timestamp
+        for mssv, timestamp in zip(members['MSSV'], members['source_timestamp'])
+    ]
+    members = members[changed]
+    if members.empty:
+        print("Không có dòng mới hoặc thay đổi")
+        return {'added': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+
+    totals = {'added': 0, 'updated': 0, 'unchanged': 0, 'errors': []}
+    rows = members.to_dict('records')
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        response = requests.post(f"{server_url.rstrip('/')}/api/members/sync", json={'rows': chunk}, timeout=60)
+        response.raise_for_status()
+        result = response.json()
+        for key in ('added', 'updated', 'unchanged'):
+            totals[key] += result[key]
+        totals['errors'].extend(result['errors'])
+        # Chỉ ghi nhận các dòng server đã nhận để lần sau gửi lại nếu bị lỗi giữa chừng;
+        # dòng bị server từ chối cũng được gửi lại ở lần đồng bộ sau
+        rejected = {error['row'].get('MSSV') for error in result['errors']}
+        for row in chunk:
+            if row['MSSV'] in rejected:
+                state.pop(row['MSSV'], None)
+            else:
+                state[row['MSSV']] = row['source_timestamp']
+        save_sync_state(state_path, state)
+
+    print(f"Đồng bộ: thêm {totals['added']}, cập nhật {totals['updated']}, "
+          f"không đổi {totals['unchanged']}, lỗi {len(totals['errors'])}, bỏ qua {skipped_count} dòng")
+    for error in totals['errors']:
+        print(f"  Lỗi: {error['message']} - {error['row']}")
+    return totals
+
+def run_sync(source, server_url, watch=None, state_path=sync_state_file):
+    """Đồng bộ một lần, hoặc lặp lại mỗi `watch` giây"""
+    while True:
+        try:
+            df = load_sheet(source)
+            if df is not None:
+                sync_sheet_to_server(df, server_url, state_path)
+        except Exception as e:
+            print(f"Lỗi khi đồng bộ: {e}")
+            if not watch:
+                raise
+        if not watch:
+            return
+        time.sleep(watch)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Import danh sách ứng viên từ Google Sheets")
+    parser.add_argument('--sync', action='store_true',
+                        help="đồng bộ tăng dần vào server đang chạy thay vì xóa và import lại")
+    parser.add_argument('--source', help="URL Google Sheets hoặc đường dẫn file CSV")
+    parser.add_argument('--server', default='http://localhost:8091', help="địa chỉ backend đang chạy")
+    parser.add_argument('--watch', type=float, metavar='SECONDS', help="lặp lại đồng bộ mỗi SECONDS giây")
+    parser.add_argument('--state', default=sync_state_file, help="file lưu Timestamp đã đồng bộ")
+    args = parser.parse_args()
+
+    if args.sync:
+        if not args.source:
+            parser.error("--sync cần --source")
+        try:
+            run_sync(args.source, args.server, args.watch, args.state)
+        except KeyboardInterrupt:
+            print("Đã dừng đồng bộ.")
+    else:
+        main()
\ No newline at end of file